@@ -1,20 +1,29 @@
+import time
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models
-from collections import deque
-import random
+from ai_control_system.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
 
 class DQNAgent:
-    def __init__(self, state_size, action_size):
+    def __init__(self, state_size, action_size, memory_size=100000, prioritized_replay=False, target_update_interval=100):
         self.state_size = state_size
         self.action_size = action_size
-        self.memory = deque(maxlen=2000)
+        if prioritized_replay:
+            self.memory = PrioritizedReplayBuffer(memory_size, state_size)
+        else:
+            self.memory = ReplayBuffer(memory_size, state_size)
         self.gamma = 0.95  # discount rate
         self.epsilon = 1.0  # exploration rate
         self.epsilon_min = 0.01
         self.epsilon_decay = 0.995
         self.learning_rate = 0.001
         self.model = self._build_model()
+        
+        # Separate target network for the bootstrap targets, synced every target_update_interval updates
+        self.target_model = self._build_model()
+        self.target_model.set_weights(self.model.get_weights())
+        self.target_update_interval = target_update_interval
+        self.train_steps = 0
 
     def _build_model(self):
         model = models.Sequential([
@@ -28,7 +37,7 @@ class DQNAgent:
         return model
 
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
 
     def act(self, state):
         if np.random.rand() <= self.epsilon:
@@ -36,21 +45,96 @@ class DQNAgent:
         act_values = self.model.predict(state)
         return act_values[0]
 
+    @tf.function
+    def _train_step(self, states, actions, rewards, next_states, dones, weights):
+        # One gradient step on a whole minibatch; targets come from a single target-network pass
+        next_q = self.target_model(next_states, training=False)
+        targets = rewards + self.gamma * (1.0 - dones) * tf.reduce_max(next_q, axis=1)
+        
+        with tf.GradientTape() as tape:
+            q_values = self.model(states, training=True)
+            q_taken = tf.reduce_sum(q_values * tf.one_hot(actions, self.action_size), axis=1)
+            td_errors = targets - q_taken
+            # Importance weights correct the bias of prioritized sampling (all 1 for uniform)
+            loss = tf.reduce_mean(weights * tf.square(td_errors))
+        
+        grads = tape.gradient(loss, self.model.trainable_variables)
+        self.model.optimizer.apply_gradients(zip(grads, self.model.trainable_variables))
+        return loss, td_errors
+
     def replay(self, batch_size):
-        minibatch = random.sample(self.memory, batch_size)
-        for state, action, reward, next_state, done in minibatch:
+        minibatch = self.memory.sample(batch_size)
+        loss, td_errors = self._train_step(
+            tf.convert_to_tensor(minibatch['states']),
+            tf.convert_to_tensor(minibatch['actions']),
+            tf.convert_to_tensor(minibatch['rewards']),
+            tf.convert_to_tensor(minibatch['next_states']),
+            tf.convert_to_tensor(minibatch['dones'].astype(np.float32)),
+            tf.convert_to_tensor(minibatch['weights'])
+        )
+        if isinstance(self.memory, PrioritizedReplayBuffer):
+            self.memory.update_priorities(minibatch['indices'], td_errors.numpy())
+        
+        self.train_steps += 1
+        if self.train_steps % self.target_update_interval == 0:
+            self.update_target_model()
+        
+        if self.epsilon > self.epsilon_min:
+            self.epsilon *= self.epsilon_decay
+        return float(loss)
+
+    def update_target_model(self):
+        self.target_model.set_weights(self.model.get_weights())
+
+    def replay_per_sample(self, batch_size):
+        # Previous update: predict/predict/fit per sample, against the online network.
+        # Kept as the baseline for benchmark_replay.
+        minibatch = self.memory.sample(batch_size)
+        td_errors = np.zeros(batch_size)
+        for i in range(batch_size):
+            state = minibatch['states'][i:i + 1]
+            next_state = minibatch['next_states'][i:i + 1]
+            action = minibatch['actions'][i]
+            reward = minibatch['rewards'][i]
             target = reward
-            if not done:
+            if not minibatch['dones'][i]:
                 target = (reward + self.gamma *
                           np.amax(self.model.predict(next_state)[0]))
             target_f = self.model.predict(state)
+            td_errors[i] = target - target_f[0][action]
             target_f[0][action] = target
-            self.model.fit(state, target_f, epochs=1, verbose=0)
+            # Importance weights correct the bias of prioritized sampling (all 1 for uniform)
+            self.model.fit(state, target_f, sample_weight=minibatch['weights'][i:i + 1], epochs=1, verbose=0)
+        if isinstance(self.memory, PrioritizedReplayBuffer):
+            self.memory.update_priorities(minibatch['indices'], td_errors)
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
 
     def load(self, name):
         self.model.load_weights(name)
+        self.update_target_model()  # Otherwise the targets come from the untrained network
 
     def save(self, name):
         self.model.save_weights(name)
+
+def benchmark_replay(state_size=9, action_size=3, batch_size=32, updates=50, memory_size=10000):
+    # Minibatch updates per second: vectorized tf.function replay vs the per-sample loop
+    agent = DQNAgent(state_size, action_size, memory_size=memory_size)
+    rng = np.random.default_rng(0)
+    for _ in range(memory_size):
+        agent.remember(rng.normal(size=state_size), rng.integers(action_size), rng.normal(),
+                       rng.normal(size=state_size), rng.random() < 0.05)
+    
+    results = {}
+    for name, update in (('vectorized', agent.replay), ('per_sample', agent.replay_per_sample)):
+        update(batch_size)  # Warm up, including tf.function tracing
+        start = time.perf_counter()
+        for _ in range(updates):
+            update(batch_size)
+        results[name] = updates / (time.perf_counter() - start)
+        print(f"{name}: {results[name]:.1f} updates/s (batch size {batch_size})")
+    print(f"Speedup: {results['vectorized'] / results['per_sample']:.1f}x")
+    return results
+
+if __name__ == "__main__":
+    benchmark_replay()
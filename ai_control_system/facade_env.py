@@ -1,17 +1,68 @@
 import gym
 from gym import spaces
 import numpy as np
-from data_acquisition.fetch_data import fetch_weather_data, load_config
-from revit_integration.revit_integration import RevitIntegration
-from simulation.physics_simulation import PhysicsSimulator, run_physics_simulation, check_physical_constraints
+from data_acquisition.fetch_data import load_config
+from data_acquisition.weather_provider import get_weather_provider
+from revit_integration.energy_backends import create_energy_backend
+from simulation.panel_array import PanelArray, as_panel_array
+from simulation.physics_simulation import PhysicsSimulator, PanelMotionCache, run_physics_simulation, check_physical_constraints, check_panel_transitions
+
+WEATHER_MAPPING = {'Clear': 0, 'Clouds': 1, 'Rain': 2, 'Snow': 3}
+
+# Panel speed limits enforced on every step
+MAX_ROTATION_SPEED = 30  # degrees per second
+MAX_DEPTH_CHANGE_SPEED = 0.2  # meters per second
+
+def weather_observation(weather_data):
+    # The six weather entries of the observation, from one OpenWeatherMap-style response
+    return np.array([
+        weather_data['main']['temp'],
+        weather_data['main']['humidity'],
+        weather_data['wind']['speed'],
+        weather_data['wind']['deg'],
+        weather_data['clouds']['all'],
+        WEATHER_MAPPING.get(weather_data['weather'][0]['main'], 0)
+    ], dtype=np.float32)
+
+def calculate_wind_force(wind_speed):
+    return 0.5 * 1.225 * (wind_speed ** 2)  # Simple wind force calculation
+
+# Ideal comfort ranges
+IDEAL_TEMP_RANGE = (20, 26)
+IDEAL_HUMIDITY_RANGE = (30, 60)
+
+def _range_comfort(values, ideal_range, scale):
+    # 1 inside the ideal range, falling off linearly with the distance to the nearest bound
+    values = np.asarray(values, dtype=float)
+    distance = np.minimum(np.abs(values - ideal_range[0]), np.abs(values - ideal_range[1]))
+    inside = (values >= ideal_range[0]) & (values <= ideal_range[1])
+    return np.where(inside, 1.0, 1 - distance / scale)
+
+def comfort_scores(indoor_temp, indoor_humidity):
+    # Vectorized comfort score; accepts scalars or arrays of indoor conditions
+    temp_comfort = _range_comfort(indoor_temp, IDEAL_TEMP_RANGE, 10)
+    humidity_comfort = _range_comfort(indoor_humidity, IDEAL_HUMIDITY_RANGE, 50)
+    
+    # Combine temperature and humidity comfort (you can adjust the weights)
+    return 0.6 * temp_comfort + 0.4 * humidity_comfort
 
 class FacadeEnv(gym.Env):
-    def __init__(self):
+    def __init__(self, step_duration=10, physics_substeps=10, stateful_physics=True, energy_backend=None):
         super(FacadeEnv, self).__init__()
         
         self.config = load_config()
-        self.revit_integration = None  # Will be set by MainController
+        self.weather_provider = get_weather_provider(self.config)
+        # Built from the config unless given (the Revit backend has to be built inside Revit)
+        self.energy_backend = energy_backend if energy_backend is not None else create_energy_backend(self.config)
+        self.energy_jobs = None  # Optional EnergyJobQueue; rewards are then settled by resolve_rewards()
+        self._pending_energy = {}  # Step index -> future of its energy evaluation
         self.physics_simulator = PhysicsSimulator(mass=10, spring_constant=100, damping_coefficient=5)
+        self.physics_cache = PanelMotionCache(max_entries=100000)  # Reused across steps and episodes
+        self.step_duration = step_duration  # Simulated seconds per environment step
+        self.physics_substeps = physics_substeps  # More substeps follow wind changes more closely
+        self.stateful_physics = stateful_physics  # Carry panel motion over between steps
+        self.panel_state = None
+        self.last_wind_force = None
         
         # Define action and observation space
         self.action_space = spaces.Box(low=0, high=1, shape=(3,), dtype=np.float32)
@@ -25,27 +76,40 @@ class FacadeEnv(gym.Env):
 
     def reset(self):
         self.step_count = 0
+        self.weather_provider.start_episode()
         self.current_state = self._get_observation()
         self.current_energy_use = None
         self.current_comfort_score = None
+        self.panel_state = None
+        self.last_wind_force = None
+        self._pending_energy = {}
         return self.current_state
 
     def step(self, action):
         self.step_count += 1
+        self.weather_provider.advance()
         
         # Apply the action (façade adjustments)
         facade_state = self._apply_action(action)
         
         # Run physics simulation
         wind_force = self._calculate_wind_force()
-        simulated_panels = run_physics_simulation(facade_state, wind_force)
+        if self.stateful_physics:
+            previous_panels, simulated_panels = self._advance_panels(facade_state, wind_force)
+            constraints_satisfied = check_panel_transitions(previous_panels, simulated_panels, MAX_ROTATION_SPEED, MAX_DEPTH_CHANGE_SPEED)
+        else:
+            simulated_panels = run_physics_simulation(facade_state, wind_force, cache=self.physics_cache)
+            constraints_satisfied = check_physical_constraints(simulated_panels, MAX_ROTATION_SPEED, MAX_DEPTH_CHANGE_SPEED)
+        self.last_wind_force = wind_force
         
         # Check physical constraints
-        if not check_physical_constraints(simulated_panels, max_rotation_speed=30, max_depth_change_speed=0.2):
-            # If constraints are violated, penalize the agent
+        if not constraints_satisfied:
+            # If constraints are violated, penalize the agent and leave the panels where they were
             reward = -1000
             new_state = self.current_state
         else:
+            if self.stateful_physics:
+                self.panel_state = simulated_panels
             # Get the new state and calculate reward
             new_state = self._get_observation(simulated_panels)
             reward = self._calculate_reward(new_state)
@@ -58,21 +122,13 @@ class FacadeEnv(gym.Env):
         return new_state, reward, done, {}
 
     def _get_observation(self, simulated_panels=None):
-        weather_data = fetch_weather_data(self.config['openweathermap_api_key'], self.config['city'])
-        
-        weather_obs = np.array([
-            weather_data['main']['temp'],
-            weather_data['main']['humidity'],
-            weather_data['wind']['speed'],
-            weather_data['wind']['deg'],
-            weather_data['clouds']['all'],
-            self._get_weather_condition_encoding(weather_data['weather'][0]['main'])
-        ], dtype=np.float32)
-        
-        if simulated_panels:
+        weather_obs = weather_observation(self.weather_provider.get())
+        
+        if simulated_panels is not None and len(simulated_panels) > 0:
+            simulated_panels = as_panel_array(simulated_panels)
             facade_obs = np.array([
-                np.mean([panel['rotation'] for panel in simulated_panels]),
-                np.mean([panel['depth'] for panel in simulated_panels]),
+                np.mean(simulated_panels.rotation),
+                np.mean(simulated_panels.depth),
                 len(simulated_panels)
             ], dtype=np.float32)
         else:
@@ -81,8 +137,7 @@ class FacadeEnv(gym.Env):
         return np.concatenate([weather_obs, facade_obs])
 
     def _get_weather_condition_encoding(self, condition):
-        weather_mapping = {'Clear': 0, 'Clouds': 1, 'Rain': 2, 'Snow': 3}
-        return weather_mapping.get(condition, 0)
+        return WEATHER_MAPPING.get(condition, 0)
 
     def _apply_action(self, action):
         # Convert action to façade adjustments
@@ -90,25 +145,66 @@ class FacadeEnv(gym.Env):
         rotation_angle = action[1] * 90  # Range: 0-90 degrees
         panel_depth = 0.1 + action[2] * 0.4  # Range: 0.1-0.5 meters
         
-        facade_state = [
-            {'time': self.step_count, 'rotation': rotation_angle, 'depth': panel_depth}
-            for _ in range(panel_count)
-        ]
+        facade_state = PanelArray.uniform(panel_count, time=self.step_count * self.step_duration, rotation=rotation_angle, depth=panel_depth)
         
         return facade_state
 
+    def _advance_panels(self, facade_state, wind_force):
+        # Advance the carried panel state towards the commanded depths over one step
+        previous_panels = self._previous_panels(facade_state)
+        positions, velocities = self.physics_simulator.advance_panels(
+            previous_panels.depth,
+            previous_panels.velocity,
+            rest_positions=facade_state.depth,
+            force=wind_force,
+            duration=self.step_duration,
+            substeps=self.physics_substeps,
+            initial_force=self.last_wind_force
+        )
+        return previous_panels, facade_state.replace(depth=positions, velocity=velocities)
+
+    def _previous_panels(self, facade_state):
+        # Panel state at the start of the step, aligned with the commanded panel count.
+        # Panels added since the last step start at rest at their commanded depth and rotation.
+        depth = facade_state.depth.copy()
+        rotation = facade_state.rotation.copy()
+        velocity = np.zeros(len(facade_state))
+        if self.panel_state is not None:
+            kept = min(len(facade_state), len(self.panel_state))
+            depth[:kept] = self.panel_state.depth[:kept]
+            rotation[:kept] = self.panel_state.rotation[:kept]
+            velocity[:kept] = self.panel_state.velocity[:kept]
+        return PanelArray(time=facade_state.time - self.step_duration, rotation=rotation, depth=depth, velocity=velocity)
+
     def _calculate_wind_force(self):
-        weather_data = fetch_weather_data(self.config['openweathermap_api_key'], self.config['city'])
-        wind_speed = weather_data['wind']['speed']
-        return 0.5 * 1.225 * (wind_speed ** 2)  # Simple wind force calculation
+        weather_data = self.weather_provider.get()
+        return calculate_wind_force(weather_data['wind']['speed'])
 
     def _calculate_reward(self, state):
+        if self.energy_jobs is not None:
+            # Submit the energy simulation and carry on; the reward is a placeholder until resolve_rewards()
+            self._pending_energy[self.step_count - 1] = self.energy_jobs.submit(self.energy_backend, state[np.newaxis])
+            return 0.0
+        
         # Run energy simulation
-        facade_geometry = self._create_facade_geometry(state)
-        self.revit_integration.import_facade_model(facade_geometry)
-        energy_model = self.revit_integration.setup_energy_model()
-        simulation_results = self.revit_integration.run_energy_simulation(energy_model)
-        self.revit_integration.analyze_results(simulation_results)
+        batch_results = self.energy_backend.evaluate(state[np.newaxis])
+        return self._reward_from_results(state, batch_results)
+
+    def resolve_rewards(self, rewards):
+        # Waits for the energy jobs submitted this episode and replaces their placeholder rewards.
+        # Rewards are chained in step order exactly as synchronous evaluation would. Also returns
+        # the (energy use, comfort score) that was current after each step.
+        rewards = list(rewards)
+        energy_and_comfort = []
+        for step_index in range(len(rewards)):
+            future = self._pending_energy.pop(step_index, None)
+            if future is not None:
+                rewards[step_index] = self._reward_from_results(None, future.result())
+            energy_and_comfort.append((self.current_energy_use, self.current_comfort_score))
+        return rewards, energy_and_comfort
+
+    def _reward_from_results(self, state, batch_results):
+        simulation_results = {metric: float(values[0]) for metric, values in batch_results.items()}
         
         new_energy_use = simulation_results['annual_energy_use']
         new_comfort_score = self._calculate_comfort_score(state, simulation_results)
@@ -138,33 +234,5 @@ class FacadeEnv(gym.Env):
         indoor_temp = simulation_results.get('indoor_temperature', 22)  # Assume 22°C if not provided
         indoor_humidity = simulation_results.get('indoor_humidity', 50)  # Assume 50% if not provided
         
-        # Ideal comfort ranges
-        ideal_temp_range = (20, 26)
-        ideal_humidity_range = (30, 60)
-        
-        # Calculate temperature comfort (0 to 1)
-        if ideal_temp_range[0] <= indoor_temp <= ideal_temp_range[1]:
-            temp_comfort = 1
-        else:
-            temp_comfort = 1 - min(abs(indoor_temp - ideal_temp_range[0]), abs(indoor_temp - ideal_temp_range[1])) / 10
-        
-        # Calculate humidity comfort (0 to 1)
-        if ideal_humidity_range[0] <= indoor_humidity <= ideal_humidity_range[1]:
-            humidity_comfort = 1
-        else:
-            humidity_comfort = 1 - min(abs(indoor_humidity - ideal_humidity_range[0]), abs(indoor_humidity - ideal_humidity_range[1])) / 50
-        
-        # Combine temperature and humidity comfort (you can adjust the weights)
-        comfort_score = 0.6 * temp_comfort + 0.4 * humidity_comfort
-        
-        return comfort_score
+        return float(comfort_scores(indoor_temp, indoor_humidity))
 
-    def _create_facade_geometry(self, state):
-        # Extract facade parameters from state
-        rotation = state[6]
-        depth = state[7]
-        panel_count = int(state[8])
-        
-        # This is a placeholder for creating façade geometry
-        # In a real implementation, you would create actual Revit geometry here
-        return [{'panel_id': i, 'rotation': rotation, 'depth': depth} for i in range(panel_count)]
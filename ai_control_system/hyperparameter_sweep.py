@@ -0,0 +1,203 @@
+import itertools
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+# Grid of control-model settings; every combination is one trial
+DEFAULT_SEARCH_SPACE = {
+    'hidden_layers': [(64, 32, 16), (128, 64), (32, 32), (128, 64, 32, 16)],
+    'learning_rate': [1e-3, 3e-4],
+    'batch_size': [32, 128]
+}
+
+DATASET_ARRAYS = ['X_train', 'y_train', 'X_val', 'y_val']
+
+def expand_search_space(search_space, max_trials=None, seed=0):
+    # All combinations, or a random subset of max_trials of them
+    names = list(search_space)
+    configs = [dict(zip(names, values)) for values in itertools.product(*(search_space[name] for name in names))]
+    if max_trials is not None and max_trials < len(configs):
+        rng = np.random.default_rng(seed)
+        configs = [configs[i] for i in sorted(rng.choice(len(configs), max_trials, replace=False))]
+    return configs
+
+def prepare_dataset(data_source, dataset_dir, cities=None, start_date=None, end_date=None, validation_fraction=0.2, seed=42):
+    # Preprocesses once in the parent and saves float32 .npy arrays, already shuffled, plus
+    # the fitted scaler (scaler.pkl) so the winning trial can be retrained and served with
+    # the same normalization. Trials memory-map the arrays read-only and stream batches from
+    # them (memmap_batches), so every worker reads the same pages of the OS cache.
+    import joblib
+    from ai_control_system.model import FEATURES, TARGETS, load_training_data, preprocess_data
+
+    data = load_training_data(data_source, cities, start_date, end_date)
+    data, scaler = preprocess_data(data)
+
+    # Dummy targets, as in train_model, unless the data carries real ones
+    rng = np.random.default_rng(seed)
+    for target in TARGETS:
+        if target not in data:
+            data[target] = rng.random(len(data))
+
+    order = rng.permutation(len(data))
+    split = int(len(data) * (1 - validation_fraction))
+    features = data[FEATURES].to_numpy(dtype=np.float32)
+    targets = data[TARGETS].to_numpy(dtype=np.float32)
+    arrays = {
+        'X_train': features[order[:split]], 'y_train': targets[order[:split]],
+        'X_val': features[order[split:]], 'y_val': targets[order[split:]]
+    }
+
+    os.makedirs(dataset_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(dataset_dir, f'{name}.npy'), array)
+    joblib.dump(scaler, os.path.join(dataset_dir, 'scaler.pkl'))
+    print(f"Prepared {split} training and {len(data) - split} validation rows in {dataset_dir}")
+    return scaler
+
+def memmap_batches(features, targets, batch_size, shuffle=False, seed=None):
+    # tf.data pipeline reading one batch at a time from memory-mapped arrays, so a trial only
+    # ever holds a few batches in memory rather than a private copy of the dataset. Rows were
+    # shuffled once by prepare_dataset; each epoch additionally shuffles the batch order.
+    import tensorflow as tf
+
+    starts = np.arange(0, len(features), batch_size)
+    rng = np.random.default_rng(seed)
+
+    def generate():
+        for start in (rng.permutation(starts) if shuffle else starts):
+            yield np.asarray(features[start:start + batch_size]), np.asarray(targets[start:start + batch_size])
+
+    dataset = tf.data.Dataset.from_generator(generate, output_signature=(
+        tf.TensorSpec(shape=(None, features.shape[1]), dtype=tf.float32),
+        tf.TensorSpec(shape=(None, targets.shape[1]), dtype=tf.float32)
+    ))
+    return dataset.prefetch(2)
+
+@contextmanager
+def _worker_thread_limits(threads):
+    # Thread caps for the worker processes. Spawned workers import numpy (and with it
+    # OpenBLAS/MKL) while unpickling their first task, before any initializer runs, so the
+    # caps have to be in the environment they inherit; the parent's is restored afterwards.
+    limits = {name: str(threads) for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS')}
+    limits['TF_NUM_INTEROP_THREADS'] = '1'
+    limits['TF_CPP_MIN_LOG_LEVEL'] = os.environ.get('TF_CPP_MIN_LOG_LEVEL', '2')
+    saved = {name: os.environ.get(name) for name in limits}
+    os.environ.update(limits)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def _run_trial(trial_id, config, dataset_dir, max_epochs, patience, warmup_epochs, shared_losses, threads):
+    import tensorflow as tf
+    from ai_control_system.model import create_model
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    data = {name: np.load(os.path.join(dataset_dir, f'{name}.npy'), mmap_mode='r') for name in DATASET_ARRAYS}
+    model = create_model((data['X_train'].shape[1],), config['hidden_layers'], config['learning_rate'])
+
+    class MedianStopping(tf.keras.callbacks.Callback):
+        # Stops a trial whose validation loss after warmup is worse than the median of the
+        # other trials at the same epoch; losses are shared through a manager dict
+        stopped_reason = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            loss = float(logs['val_loss'])
+            shared_losses[(trial_id, epoch)] = loss
+            if epoch + 1 < warmup_epochs:
+                return
+            others = [value for (other_id, other_epoch), value in shared_losses.items()
+                      if other_epoch == epoch and other_id != trial_id]
+            if len(others) >= 2 and loss > np.median(others):
+                self.stopped_reason = 'median'
+                self.model.stop_training = True
+
+    median_stopping = MedianStopping()
+    early_stopping = tf.keras.callbacks.EarlyStopping(patience=patience, restore_best_weights=True)
+    start = time.perf_counter()
+    train_batches = memmap_batches(data['X_train'], data['y_train'], config['batch_size'], shuffle=True, seed=trial_id)
+    val_batches = memmap_batches(data['X_val'], data['y_val'], config['batch_size'])
+    history = model.fit(train_batches, validation_data=val_batches, epochs=max_epochs, verbose=0,
+                        callbacks=[median_stopping, early_stopping])
+    duration = time.perf_counter() - start
+
+    val_losses = history.history['val_loss']
+    epochs_run = len(val_losses)
+    if median_stopping.stopped_reason is not None:
+        stopped = median_stopping.stopped_reason
+    elif epochs_run < max_epochs:
+        stopped = 'plateau'
+    else:
+        stopped = None
+    return {
+        'trial': trial_id,
+        'hidden_layers': '-'.join(str(width) for width in config['hidden_layers']),
+        'learning_rate': config['learning_rate'],
+        'batch_size': config['batch_size'],
+        'best_val_loss': float(np.min(val_losses)),
+        'final_val_loss': float(val_losses[-1]),
+        'epochs': epochs_run,
+        'stopped_early': stopped,
+        'duration': duration,
+        'samples_per_s': len(data['X_train']) * epochs_run / duration
+    }
+
+def run_sweep(data_source, search_space=None, dataset_dir='ai_control_system/results/sweep_data',
+              results_path='ai_control_system/results/sweep_results.csv', num_workers=None, threads_per_trial=1,
+              max_trials=None, max_epochs=100, patience=10, warmup_epochs=5, **data_query):
+    # Runs every trial of the search space across worker processes. Each worker gets
+    # threads_per_trial math/TensorFlow threads, and by default as many workers run as fit in
+    # the machine's cores. Returns the results table sorted by best validation loss and the
+    # scaler the trials' data was normalized with (also saved as scaler.pkl in dataset_dir).
+    configs = expand_search_space(search_space or DEFAULT_SEARCH_SPACE, max_trials)
+    num_workers = num_workers or max(1, (os.cpu_count() or 1) // threads_per_trial)
+    scaler = prepare_dataset(data_source, dataset_dir, **data_query)
+
+    ctx = mp.get_context('spawn')  # TensorFlow may already be loaded here; fork is unsafe
+    manager = ctx.Manager()
+    shared_losses = manager.dict()
+    results = []
+    start = time.perf_counter()
+    try:
+        with _worker_thread_limits(threads_per_trial), ProcessPoolExecutor(max_workers=num_workers, mp_context=ctx) as executor:
+            futures = {executor.submit(_run_trial, trial_id, config, dataset_dir, max_epochs, patience,
+                                       warmup_epochs, shared_losses, threads_per_trial): trial_id
+                       for trial_id, config in enumerate(configs)}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as error:
+                    print(f"Trial {futures[future]} failed: {error}")
+                    continue
+                results.append(result)
+                print(f"Trial {result['trial']} ({result['hidden_layers']}, lr={result['learning_rate']}, "
+                      f"batch={result['batch_size']}): best val loss {result['best_val_loss']:.4f} "
+                      f"after {result['epochs']} epochs" + (f", stopped ({result['stopped_early']})" if result['stopped_early'] else ""))
+    finally:
+        manager.shutdown()
+
+    table = pd.DataFrame(results)
+    if len(table):
+        table = table.sort_values('best_val_loss').reset_index(drop=True)
+        os.makedirs(os.path.dirname(results_path) or '.', exist_ok=True)
+        table.to_csv(results_path, index=False)
+    print(f"{len(results)}/{len(configs)} trials finished in {time.perf_counter() - start:.1f}s "
+          f"on {num_workers} workers x {threads_per_trial} threads; results in {results_path}, "
+          f"scaler in {os.path.join(dataset_dir, 'scaler.pkl')}")
+    return table, scaler
+
+if __name__ == "__main__":
+    from data_acquisition.columnar_store import ColumnarStore
+
+    table, scaler = run_sweep(ColumnarStore(), cities=['New_York'])
+    print(table.head(10).to_string(index=False))
@@ -1,37 +1,110 @@
-import tensorflow as tf
+import os
+import time
 import numpy as np
-import joblib
+from ai_control_system.model_registry import get_model_registry
+from ai_control_system.numpy_mlp import MODEL_BUNDLE_PATH, load_model_bundle
 from data_acquisition.fetch_data import fetch_weather_data, load_config
 
-def load_model_and_scaler():
-    model = tf.keras.models.load_model("ai_control_system/models/facade_control_model.h5")
-    scaler = joblib.load("ai_control_system/models/scaler.pkl")
-    return model, scaler
+def load_model_and_scaler(bundle_path=MODEL_BUNDLE_PATH):
+    # NumPy runtime only; the bundle is written by `python -m ai_control_system.numpy_mlp`
+    if not os.path.exists(bundle_path):
+        raise FileNotFoundError(f"Model bundle {bundle_path} not found; export it with "
+                                f"python -m ai_control_system.numpy_mlp")
+    return load_model_bundle(bundle_path)
 
-def preprocess_input(weather_data, scaler):
-    input_data = np.array([
+# Model inputs in column order; the first five are standardized by the scaler
+INPUT_COLUMNS = ['temperature', 'humidity', 'wind_speed', 'wind_direction', 'cloudiness', 'weather_condition']
+WEATHER_MAPPING = {'Clear': 0, 'Clouds': 1, 'Rain': 2, 'Snow': 3}
+
+def weather_to_row(weather_data):
+    # One OpenWeatherMap response as a row of INPUT_COLUMNS
+    return [
         weather_data['main']['temp'],
         weather_data['main']['humidity'],
         weather_data['wind']['speed'],
         weather_data['wind']['deg'],
         weather_data['clouds']['all'],
-        0  # placeholder for weather condition
-    ]).reshape(1, -1)
-    
-    # Map weather condition
-    weather_mapping = {'Clear': 0, 'Clouds': 1, 'Rain': 2, 'Snow': 3}
-    input_data[0, 5] = weather_mapping.get(weather_data['weather'][0]['main'], 0)
-    
-    # Normalize the input data
-    input_data[:, :5] = scaler.transform(input_data[:, :5])
-    
+        weather_data['weather'][0]['main']
+    ]
+
+def map_weather_conditions(conditions):
+    # Condition names to codes (unknown names map to 0, like Clear); numeric codes, alone or
+    # mixed in with names, pass through unchanged. Each distinct name is looked up once,
+    # however many rows share it.
+    conditions = np.asarray(conditions, dtype=object).reshape(-1)
+    is_name = np.array([isinstance(value, str) for value in conditions], dtype=bool)
+    codes = np.empty(len(conditions), dtype=np.float64)
+    codes[~is_name] = conditions[~is_name].astype(np.float64)
+    if is_name.any():
+        names, inverse = np.unique(conditions[is_name].astype(str), return_inverse=True)
+        name_codes = np.array([WEATHER_MAPPING.get(name, 0) for name in names], dtype=np.float64)
+        codes[is_name] = name_codes[inverse.reshape(-1)]
+    return codes
+
+def preprocess_batch(inputs, scaler):
+    # inputs: a DataFrame with INPUT_COLUMNS (other columns, e.g. zone ids, are ignored), an
+    # (n, 6) array in INPUT_COLUMNS order, or a list of OpenWeatherMap responses.
+    # Returns the (n, 6) model input matrix.
+    if hasattr(inputs, 'columns'):
+        numeric = inputs[INPUT_COLUMNS[:5]].to_numpy(dtype=np.float64)
+        conditions = inputs[INPUT_COLUMNS[5]].to_numpy()
+    else:
+        if len(inputs) and isinstance(inputs[0], dict):
+            inputs = [weather_to_row(weather_data) for weather_data in inputs]
+        rows = np.asarray(inputs, dtype=object).reshape(-1, len(INPUT_COLUMNS))
+        numeric = rows[:, :5].astype(np.float64)
+        conditions = rows[:, 5]
+
+    input_data = np.empty((len(numeric), len(INPUT_COLUMNS)))
+    input_data[:, :5] = scaler.transform(numeric)
+    input_data[:, 5] = map_weather_conditions(conditions)
     return input_data
 
+def preprocess_input(weather_data, scaler):
+    return preprocess_batch([weather_data], scaler)
+
+def get_facade_adjustments_batch_with_version(inputs, registry=None):
+    # All zones go through one forward pass of the same model version
+    registry = registry or get_model_registry()
+    serving = registry.current()
+    input_data = preprocess_batch(inputs, serving.scaler)
+    return registry.predict(input_data, serving)
+
+def get_facade_adjustments_batch(inputs, registry=None):
+    # (n, 3) adjustments, one row per input row
+    adjustments, _ = get_facade_adjustments_batch_with_version(inputs, registry)
+    return adjustments
+
+def get_facade_adjustments_with_version(weather_data, registry=None):
+    # The model is loaded once per process and hot-reloaded when the bundle changes;
+    # returns the adjustments and the model version that produced them
+    adjustments, version = get_facade_adjustments_batch_with_version([weather_data], registry)
+    return adjustments[0], version
+
 def get_facade_adjustments(weather_data):
-    model, scaler = load_model_and_scaler()
-    input_data = preprocess_input(weather_data, scaler)
-    predictions = model.predict(input_data)
-    return predictions[0]
+    adjustments, _ = get_facade_adjustments_with_version(weather_data)
+    return adjustments
+
+def benchmark_batch_inference(zone_counts=(1, 10, 100, 1000), repeats=100, registry=None, seed=0):
+    # Time per tick as the number of zones grows, with synthetic weather rows
+    rng = np.random.default_rng(seed)
+    conditions = np.array(list(WEATHER_MAPPING))
+    results = {}
+    for zones in zone_counts:
+        rows = np.empty((zones, len(INPUT_COLUMNS)), dtype=object)
+        rows[:, 0] = rng.uniform(-10, 35, zones)
+        rows[:, 1] = rng.uniform(20, 100, zones)
+        rows[:, 2] = rng.uniform(0, 15, zones)
+        rows[:, 3] = rng.uniform(0, 360, zones)
+        rows[:, 4] = rng.uniform(0, 100, zones)
+        rows[:, 5] = rng.choice(conditions, zones)
+        get_facade_adjustments_batch(rows, registry)  # Warm up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            get_facade_adjustments_batch(rows, registry)
+        results[zones] = (time.perf_counter() - start) / repeats * 1000
+        print(f"{zones:>5} zones: {results[zones]:.3f} ms per tick")
+    return results
 
 if __name__ == "__main__":
     config = load_config()
@@ -51,3 +124,6 @@ if __name__ == "__main__":
     print(f"Adjustment 1: {adjustments[0]:.2f}")
     print(f"Adjustment 2: {adjustments[1]:.2f}")
     print(f"Adjustment 3: {adjustments[2]:.2f}")
+    
+    print("\nBatch inference:")
+    benchmark_batch_inference()
@@ -1,3 +1,6 @@
+import glob
+import os
+import time
 import tensorflow as tf
 from tensorflow.keras import layers, models
 import numpy as np
@@ -5,31 +8,42 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 
-def create_model(input_shape):
-    model = models.Sequential([
-        layers.Dense(64, activation='relu', input_shape=input_shape),
-        layers.Dense(32, activation='relu'),
-        layers.Dense(16, activation='relu'),
-        layers.Dense(3, activation='linear')  # 3 outputs for façade adjustments
-    ])
-    model.compile(optimizer='adam', loss='mse')
+DEFAULT_HIDDEN_LAYERS = (64, 32, 16)
+
+def create_model(input_shape, hidden_layers=DEFAULT_HIDDEN_LAYERS, learning_rate=0.001):
+    model = models.Sequential([layers.Input(shape=input_shape)])
+    for width in hidden_layers:
+        model.add(layers.Dense(width, activation='relu'))
+    model.add(layers.Dense(3, activation='linear'))  # 3 outputs for façade adjustments
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate), loss='mse')
     return model
 
+WEATHER_MAPPING = {'Clear': 0, 'Clouds': 1, 'Rain': 2, 'Snow': 3}
+NUMERICAL_COLUMNS = ['temperature', 'humidity', 'wind_speed', 'wind_direction', 'cloudiness']
+FEATURES = NUMERICAL_COLUMNS + ['weather_condition']
+TARGETS = ['target_1', 'target_2', 'target_3']
+
 def preprocess_data(data):
-    # Convert weather condition to numerical
-    weather_mapping = {'Clear': 0, 'Clouds': 1, 'Rain': 2, 'Snow': 3}
-    data['weather_condition'] = data['weather_condition'].map(weather_mapping)
+    # Convert weather condition to numerical; unknown conditions count as Clear, as in preprocess_chunk
+    data['weather_condition'] = data['weather_condition'].map(WEATHER_MAPPING).fillna(0)
     
     # Normalize numerical columns
     scaler = StandardScaler()
-    numerical_columns = ['temperature', 'humidity', 'wind_speed', 'wind_direction', 'cloudiness']
-    data[numerical_columns] = scaler.fit_transform(data[numerical_columns])
+    data[NUMERICAL_COLUMNS] = scaler.fit_transform(data[NUMERICAL_COLUMNS])
     
     return data, scaler
 
-def train_model(data_path):
+def load_training_data(source, cities=None, start_date=None, end_date=None):
+    # source: a CSV path, or a ColumnarStore whose weather dataset is read with only the model's
+    # feature columns and only the requested cities and days ('YYYY-MM-DD', inclusive)
+    if isinstance(source, str):
+        return pd.read_csv(source)
+    return source.read('weather', columns=FEATURES, cities=cities, start_date=start_date, end_date=end_date)
+
+def train_model(data_source, cities=None, start_date=None, end_date=None, hidden_layers=DEFAULT_HIDDEN_LAYERS,
+                learning_rate=0.001, epochs=100, batch_size=32):
     # Load and preprocess data
-    data = pd.read_csv(data_path)
+    data = load_training_data(data_source, cities, start_date, end_date)
     data, scaler = preprocess_data(data)
     
     # For this example, we'll use dummy target values
@@ -39,18 +53,15 @@ def train_model(data_path):
     data['target_3'] = np.random.rand(len(data))
     
     # Split features and targets
-    features = ['temperature', 'humidity', 'wind_speed', 'wind_direction', 'cloudiness', 'weather_condition']
-    targets = ['target_1', 'target_2', 'target_3']
-    
-    X = data[features]
-    y = data[targets]
+    X = data[FEATURES]
+    y = data[TARGETS]
     
     # Split into train and test sets
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     # Create and train the model
-    model = create_model((len(features),))
-    model.fit(X_train, y_train, epochs=100, batch_size=32, validation_split=0.2, verbose=1)
+    model = create_model((len(FEATURES),), hidden_layers, learning_rate)
+    model.fit(X_train, y_train, epochs=epochs, batch_size=batch_size, validation_split=0.2, verbose=1)
     
     # Evaluate the model
     loss = model.evaluate(X_test, y_test)
@@ -58,11 +69,123 @@ def train_model(data_path):
     
     return model, scaler
 
+def expand_shards(data_paths):
+    # Files, directories of .csv/.parquet shards, or glob patterns, in a stable order
+    if isinstance(data_paths, str):
+        data_paths = [data_paths]
+    shards = []
+    for path in data_paths:
+        if os.path.isdir(path):
+            shards.extend(sorted(glob.glob(os.path.join(path, '*.csv')) + glob.glob(os.path.join(path, '*.parquet'))))
+        else:
+            shards.extend(sorted(glob.glob(path)) or [path])
+    return shards
+
+def iter_shard_chunks(shards, chunksize=100000, columns=None):
+    # DataFrames of at most chunksize rows, read shard by shard, so memory stays bounded by
+    # one chunk however large the history is
+    for shard in shards:
+        if shard.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(shard)
+            available = set(parquet_file.schema_arrow.names)
+            read_columns = [column for column in columns if column in available] if columns else None
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=read_columns):
+                yield batch.to_pandas()
+        else:
+            usecols = (lambda column: column in columns) if columns else None
+            for chunk in pd.read_csv(shard, chunksize=chunksize, usecols=usecols):
+                yield chunk
+
+def fit_scaler_streaming(shards, chunksize=100000):
+    # StandardScaler fitted chunk by chunk with partial_fit; returns the scaler and row count
+    scaler = StandardScaler()
+    rows = 0
+    for chunk in iter_shard_chunks(shards, chunksize, NUMERICAL_COLUMNS):
+        scaler.partial_fit(chunk[NUMERICAL_COLUMNS])
+        rows += len(chunk)
+    if rows == 0:
+        raise ValueError(f"No rows found in {shards}")
+    return scaler, rows
+
+def preprocess_chunk(chunk, scaler, rng):
+    # Feature and target arrays for one chunk; dummy targets as in train_model when the
+    # shards carry none
+    features = np.empty((len(chunk), len(FEATURES)), dtype=np.float32)
+    features[:, :5] = scaler.transform(chunk[NUMERICAL_COLUMNS])
+    features[:, 5] = chunk['weather_condition'].map(WEATHER_MAPPING).fillna(0).to_numpy()
+    if all(target in chunk for target in TARGETS):
+        targets = chunk[TARGETS].to_numpy(dtype=np.float32)
+    else:
+        targets = rng.random((len(chunk), len(TARGETS)), dtype=np.float32)
+    return features, targets
+
+def make_streaming_dataset(shards, scaler, batch_size=32, shuffle_buffer=10000, chunksize=100000, seed=42):
+    # tf.data pipeline over the shards: chunks are preprocessed in NumPy, split into rows,
+    # shuffled through a bounded buffer, batched and prefetched while the model trains
+    rng = np.random.default_rng(seed)
+
+    def generate():
+        for chunk in iter_shard_chunks(shards, chunksize, FEATURES + TARGETS):
+            yield preprocess_chunk(chunk, scaler, rng)
+
+    dataset = tf.data.Dataset.from_generator(generate, output_signature=(
+        tf.TensorSpec(shape=(None, len(FEATURES)), dtype=tf.float32),
+        tf.TensorSpec(shape=(None, len(TARGETS)), dtype=tf.float32)
+    ))
+    dataset = dataset.unbatch()
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    # Prints training rows per second for each epoch
+    def __init__(self, rows_per_epoch):
+        super().__init__()
+        self.rows_per_epoch = rows_per_epoch
+        self.epoch_times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self.epoch_start
+        self.epoch_times.append(elapsed)
+        print(f"Epoch {epoch + 1}: {self.rows_per_epoch / elapsed:.0f} rows/s")
+
+def train_model_streaming(data_paths, validation_paths=None, epochs=100, batch_size=32, chunksize=100000, shuffle_buffer=10000):
+    # Out-of-core variant of train_model for histories that do not fit in memory: the scaler
+    # is fitted in one streaming pass, then every epoch streams the shards again
+    shards = expand_shards(data_paths)
+    start = time.perf_counter()
+    scaler, rows = fit_scaler_streaming(shards, chunksize)
+    scaler_time = time.perf_counter() - start
+    print(f"Scaler fitted on {rows} rows from {len(shards)} shards ({rows / scaler_time:.0f} rows/s)")
+
+    train_dataset = make_streaming_dataset(shards, scaler, batch_size, shuffle_buffer, chunksize)
+    validation_dataset = None
+    if validation_paths:
+        validation_dataset = make_streaming_dataset(expand_shards(validation_paths), scaler, batch_size, 0, chunksize)
+
+    model = create_model((len(FEATURES),))
+    throughput = ThroughputCallback(rows)
+    model.fit(train_dataset, validation_data=validation_dataset, epochs=epochs, callbacks=[throughput], verbose=1)
+    print(f"Trained on {rows * epochs} rows in {sum(throughput.epoch_times):.1f}s "
+          f"({rows * epochs / sum(throughput.epoch_times):.0f} rows/s)")
+
+    return model, scaler
+
 if __name__ == "__main__":
-    data_path = "data_acquisition/data/processed/New_York_20230501.csv"  # Update this path
-    model, scaler = train_model(data_path)
+    from data_acquisition.columnar_store import ColumnarStore
+    
+    # Processed weather is imported with `python -m data_acquisition.columnar_store`
+    model, scaler = train_model(ColumnarStore(), cities=['New_York'], start_date='2023-05-01', end_date='2023-05-01')
     
     # Save the model and scaler
     model.save("ai_control_system/models/facade_control_model.h5")
     import joblib
     joblib.dump(scaler, "ai_control_system/models/scaler.pkl")
+    
+    # TensorFlow-free bundle for inference and the control server
+    from ai_control_system.numpy_mlp import export_model_bundle
+    export_model_bundle()
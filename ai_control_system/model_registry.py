@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from ai_control_system.numpy_mlp import MODEL_BUNDLE_PATH, load_model_bundle
+
+# Everything needed to serve one prediction, swapped in as a single object
+ServingModel = namedtuple('ServingModel', ['model', 'scaler', 'version', 'fingerprint', 'loaded_at'])
+
+def bundle_fingerprint(bundle_path):
+    stat = os.stat(bundle_path)
+    return stat.st_mtime_ns, stat.st_size
+
+class ModelRegistry:
+    # Keeps the exported control model in memory and hot-reloads it when the bundle on disk
+    # changes. At most every check_interval seconds a request stats the file; if its
+    # (mtime, size) changed, that one request loads the new bundle while concurrent requests
+    # keep using the current model, then the new model replaces it in a single assignment.
+    # A bundle that fails to load (e.g. half copied) is skipped and retried on the next check.
+    def __init__(self, bundle_path=MODEL_BUNDLE_PATH, check_interval=1.0, loader=load_model_bundle, clock=time.monotonic):
+        self.bundle_path = bundle_path
+        self.check_interval = check_interval
+        self.loader = loader
+        self.clock = clock
+        self._serving = None
+        self._last_check = None
+        self._reload_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'loads': 0, 'reloads': 0, 'failed_loads': 0, 'predictions': 0}
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def current(self):
+        serving = self._serving
+        now = self.clock()
+        if serving is None or now - self._last_check >= self.check_interval:
+            if serving is None:
+                # Nothing to serve yet: wait for whichever request is loading
+                with self._reload_lock:
+                    self._check_for_update()
+            elif self._reload_lock.acquire(blocking=False):
+                try:
+                    self._check_for_update()
+                finally:
+                    self._reload_lock.release()
+            serving = self._serving
+        return serving
+
+    def _check_for_update(self):
+        # Called with the reload lock held
+        if self._serving is not None and self.clock() - self._last_check < self.check_interval:
+            return
+        self._last_check = self.clock()
+        try:
+            fingerprint = bundle_fingerprint(self.bundle_path)
+            if self._serving is not None and fingerprint == self._serving.fingerprint:
+                return
+            model, scaler = self.loader(self.bundle_path)
+        except Exception as error:
+            self._count('failed_loads')
+            if self._serving is None:
+                raise
+            print(f"Warning: keeping model {self._serving.version}, could not load {self.bundle_path}: {error}")
+            return
+
+        version = getattr(model, 'version', None) or f"mtime-{fingerprint[0]}"
+        reload = self._serving is not None
+        self._serving = ServingModel(model, scaler, version, fingerprint, time.time())
+        self._count('reloads' if reload else 'loads')
+        if reload:
+            print(f"Model registry: now serving {version}")
+
+    @property
+    def version(self):
+        return self.current().version
+
+    def predict(self, input_data, serving=None):
+        # Returns (predictions, version that produced them). Pass the ServingModel whose
+        # scaler preprocessed input_data so both come from the same version.
+        serving = serving or self.current()
+        predictions = serving.model.predict(input_data)
+        self._count('predictions', len(predictions))  # One per input row
+        return predictions, serving.version
+
+_shared_registries = {}
+_shared_registries_lock = threading.Lock()
+
+def get_model_registry(bundle_path=MODEL_BUNDLE_PATH, check_interval=1.0):
+    # One registry per bundle path per process
+    with _shared_registries_lock:
+        registry = _shared_registries.get(bundle_path)
+        if registry is None:
+            registry = ModelRegistry(bundle_path, check_interval)
+            _shared_registries[bundle_path] = registry
+    return registry
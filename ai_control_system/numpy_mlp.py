@@ -0,0 +1,114 @@
+import os
+import time
+import numpy as np
+
+# TensorFlow-free runtime for the façade control MLP. export_model_bundle() flattens the Keras
+# model and the fitted StandardScaler into one .npz; load_model_bundle() rebuilds them as plain
+# NumPy objects with the same predict()/transform() calls.
+
+MODEL_PATH = "ai_control_system/models/facade_control_model.h5"
+SCALER_PATH = "ai_control_system/models/scaler.pkl"
+MODEL_BUNDLE_PATH = "ai_control_system/models/facade_control_model.npz"
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+    'softplus': lambda x: np.logaddexp(0, x)
+}
+
+class NumpyMLP:
+    # Stack of Dense layers: x @ kernel + bias, then the layer's activation
+    def __init__(self, kernels, biases, activations, version=None):
+        for activation in activations:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+        self.layers = [(np.asarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32), ACTIVATIONS[activation])
+                       for kernel, bias, activation in zip(kernels, biases, activations)]
+        self.activations = list(activations)
+        self.version = version
+
+    def predict(self, inputs):
+        x = np.asarray(inputs, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            x = activation(x @ kernel + bias)
+        return x
+
+class NumpyScaler:
+    # StandardScaler.transform with the fitted mean and scale
+    def __init__(self, mean, scale):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, values):
+        return (np.asarray(values, dtype=np.float64) - self.mean) / self.scale
+
+def export_model_bundle(model_path=MODEL_PATH, scaler_path=SCALER_PATH, bundle_path=MODEL_BUNDLE_PATH, version=None):
+    # Needs TensorFlow and joblib, but only here; the runtime side needs NumPy alone
+    import joblib
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    scaler = joblib.load(scaler_path)
+
+    arrays = {}
+    activations = []
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.InputLayer):
+            continue
+        if not isinstance(layer, tf.keras.layers.Dense):
+            raise ValueError(f"Cannot export layer {layer.name} of type {type(layer).__name__}")
+        kernel, bias = layer.get_weights()
+        arrays[f'kernel_{len(activations)}'] = kernel
+        arrays[f'bias_{len(activations)}'] = bias
+        activations.append(layer.get_config()['activation'])
+
+    num_features = scaler.n_features_in_
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(num_features)
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(num_features)
+    version = version or time.strftime('%Y%m%d-%H%M%S')
+
+    # Written beside the target and renamed over it, so readers never see a partial bundle
+    temp_path = f"{bundle_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as bundle_file:
+        np.savez(bundle_file, activations=np.array(activations), scaler_mean=mean, scaler_scale=scale,
+                 version=np.array(version), **arrays)
+    os.replace(temp_path, bundle_path)
+    print(f"Exported {len(activations)} Dense layers and scaler to {bundle_path} (version {version})")
+    return bundle_path
+
+def load_model_bundle(bundle_path=MODEL_BUNDLE_PATH):
+    with np.load(bundle_path) as data:
+        activations = [str(activation) for activation in data['activations']]
+        kernels = [data[f'kernel_{i}'] for i in range(len(activations))]
+        biases = [data[f'bias_{i}'] for i in range(len(activations))]
+        scaler = NumpyScaler(data['scaler_mean'], data['scaler_scale'])
+        version = str(data['version']) if 'version' in data.files else None
+    return NumpyMLP(kernels, biases, activations, version), scaler
+
+def check_parity(model_path=MODEL_PATH, scaler_path=SCALER_PATH, bundle_path=MODEL_BUNDLE_PATH, num_samples=1000, atol=1e-5, seed=0):
+    # Compares the bundle against the Keras model and scaler on random inputs.
+    # Returns the largest absolute differences and raises if either exceeds atol.
+    import joblib
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    scaler = joblib.load(scaler_path)
+    numpy_model, numpy_scaler = load_model_bundle(bundle_path)
+
+    rng = np.random.default_rng(seed)
+    raw = rng.normal(scaler.mean_, scaler.scale_, size=(num_samples, scaler.n_features_in_))
+    scaler_error = np.abs(scaler.transform(raw) - numpy_scaler.transform(raw)).max()
+
+    inputs = rng.normal(size=(num_samples, model.input_shape[-1])).astype(np.float32)
+    model_error = np.abs(model.predict(inputs, verbose=0) - numpy_model.predict(inputs)).max()
+
+    print(f"Max abs difference: model {model_error:.2e}, scaler {scaler_error:.2e}")
+    if model_error > atol or scaler_error > atol:
+        raise AssertionError(f"NumPy bundle differs from the Keras model by more than {atol}")
+    return model_error, scaler_error
+
+if __name__ == "__main__":
+    export_model_bundle()
+    check_parity()
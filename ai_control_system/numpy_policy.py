@@ -0,0 +1,34 @@
+import numpy as np
+
+# TensorFlow-free evaluation of PPOAgent's actor, for processes that only need to act
+
+def random_actor_weights(state_size, action_size, hidden_size=64, seed=None):
+    # Glorot-uniform weights with the same shapes as PPOAgent._build_actor
+    rng = np.random.default_rng(seed)
+    shapes = [(state_size, hidden_size), (hidden_size, hidden_size), (hidden_size, action_size), (hidden_size, action_size)]
+    weights = []
+    for fan_in, fan_out in shapes:
+        limit = np.sqrt(6 / (fan_in + fan_out))
+        weights.append(rng.uniform(-limit, limit, (fan_in, fan_out)).astype(np.float32))
+        weights.append(np.zeros(fan_out, dtype=np.float32))
+    return weights
+
+def actor_forward(weights, states):
+    # weights are in actor.get_weights() order: two ReLU hidden layers, then the tanh mean
+    # head and the softplus std head
+    w1, b1, w2, b2, w_mean, b_mean, w_std, b_std = weights
+    x = np.maximum(np.asarray(states, dtype=np.float32) @ w1 + b1, 0)
+    x = np.maximum(x @ w2 + b2, 0)
+    mean = np.tanh(x @ w_mean + b_mean)
+    std = np.logaddexp(0, x @ w_std + b_std)  # softplus
+    return mean, std
+
+def sample_actions(mean, std, rng):
+    # Gaussian policy sample, clipped to the [0, 1] action range like PPOAgent.get_action
+    return np.clip(rng.normal(mean, std), 0, 1)
+
+def gaussian_log_probs(actions, mean, std):
+    # Log-probability of each action row under the diagonal Gaussian, summed over action
+    # dimensions like PPOAgent.get_actions_and_log_probs
+    z = (actions - mean) / std
+    return np.sum(-0.5 * z ** 2 - np.log(std) - 0.5 * np.log(2 * np.pi), axis=-1)
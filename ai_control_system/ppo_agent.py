@@ -1,10 +1,24 @@
+import time
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models, optimizers
 import tensorflow_probability as tfp
+from ai_control_system.numpy_policy import actor_forward, gaussian_log_probs, sample_actions
+
+def compute_gae(rewards, values, next_values, dones, gamma=0.99, gae_lambda=0.95):
+    # Generalized advantage estimation, recursing backwards over the leading (time) axis.
+    # A done resets the recursion, so several episodes may be concatenated along time.
+    deltas = rewards + gamma * next_values * (1 - dones) - values
+    advantages = np.zeros_like(deltas)
+    last_advantage = np.zeros_like(deltas[0])
+    for t in reversed(range(len(deltas))):
+        last_advantage = deltas[t] + gamma * gae_lambda * (1 - dones[t]) * last_advantage
+        advantages[t] = last_advantage
+    return advantages
 
 class PPOAgent:
-    def __init__(self, state_size, action_size, learning_rate=0.0003, gamma=0.99, epsilon=0.2, value_coef=0.5, entropy_coef=0.01):
+    def __init__(self, state_size, action_size, learning_rate=0.0003, gamma=0.99, epsilon=0.2, value_coef=0.5, entropy_coef=0.01,
+                 gae_lambda=0.95, train_epochs=4, minibatch_size=64, seed=None):
         self.state_size = state_size
         self.action_size = action_size
         self.learning_rate = learning_rate
@@ -12,10 +26,16 @@ class PPOAgent:
         self.epsilon = epsilon
         self.value_coef = value_coef
         self.entropy_coef = entropy_coef
+        self.gae_lambda = gae_lambda
+        self.train_epochs = train_epochs
+        self.minibatch_size = minibatch_size
+        self.rng = np.random.default_rng(seed)
+        self.last_train_stats = None
 
         self.actor = self._build_actor()
         self.critic = self._build_critic()
         self.optimizer = optimizers.Adam(learning_rate)
+        self.sync_policy()
 
     def _build_actor(self):
         inputs = layers.Input(shape=(self.state_size,))
@@ -32,52 +52,104 @@ class PPOAgent:
         value = layers.Dense(1)(x)
         return models.Model(inputs, value)
 
-    def get_action(self, state):
-        state = np.array(state).reshape(1, -1)
-        mean, std = self.actor.predict(state)
-        dist = tfp.distributions.Normal(mean, std)
-        action = dist.sample()
-        return np.clip(action[0], 0, 1)  # Clip action to [0, 1] range
-
-    def train(self, states, actions, rewards, next_states, dones):
-        states = np.array(states)
-        actions = np.array(actions)
-        rewards = np.array(rewards)
-        next_states = np.array(next_states)
-        dones = np.array(dones)
-
-        # Compute advantages and returns
-        values = self.critic.predict(states).flatten()
-        next_values = self.critic.predict(next_states).flatten()
-        advantages = rewards + self.gamma * next_values * (1 - dones) - values
-        returns = advantages + values
-
-        # Normalize advantages
-        advantages = (advantages - np.mean(advantages)) / (np.std(advantages) + 1e-8)
-
+    def sync_policy(self):
+        # NumPy copy of the actor weights used for acting. Swapped in as a whole list, so a
+        # concurrent get_action sees either the old or the new policy, never a mix.
+        self.policy_weights = [np.array(w, dtype=np.float32) for w in self.actor.get_weights()]
+
+    def get_action(self, state, deterministic=False):
+        # Deterministic mode returns the policy mean; both skip Keras entirely
+        return self.get_actions(state, deterministic)[0]
+
+    def get_actions(self, states, deterministic=False):
+        # Batched variant of get_action: one forward pass for a (batch, state_size) matrix
+        states = np.asarray(states, dtype=np.float32).reshape(-1, self.state_size)
+        mean, std = actor_forward(self.policy_weights, states)
+        if deterministic:
+            return np.clip(mean, 0, 1)
+        return sample_actions(mean, std, self.rng)  # Clip action to [0, 1] range
+
+    def get_actions_and_log_probs(self, states):
+        # Like get_actions, but also returns the behaviour policy's log-probability of each
+        # (clipped) action, so train() needs no extra forward pass to get the old log-probs
+        states = np.asarray(states, dtype=np.float32).reshape(-1, self.state_size)
+        mean, std = actor_forward(self.policy_weights, states)
+        actions = sample_actions(mean, std, self.rng)
+        return actions, gaussian_log_probs(actions, mean, std)
+
+    def _log_probs(self, states, actions):
+        mean, std = self.actor(states, training=False)
+        return tf.reduce_sum(tfp.distributions.Normal(mean, std).log_prob(actions), axis=-1).numpy()
+
+    @tf.function
+    def _train_step(self, states, actions, old_log_probs, advantages, returns):
         with tf.GradientTape() as tape:
             mean, std = self.actor(states, training=True)
             dist = tfp.distributions.Normal(mean, std)
-            new_log_probs = dist.log_prob(actions)
-            old_mean, old_std = self.actor.predict(states)
-            old_dist = tfp.distributions.Normal(old_mean, old_std)
-            old_log_probs = old_dist.log_prob(actions)
+            new_log_probs = tf.reduce_sum(dist.log_prob(actions), axis=-1)
 
             ratio = tf.exp(new_log_probs - old_log_probs)
             clip_ratio = tf.clip_by_value(ratio, 1 - self.epsilon, 1 + self.epsilon)
             policy_loss = -tf.reduce_mean(tf.minimum(ratio * advantages, clip_ratio * advantages))
 
-            value_pred = self.critic(states, training=True)
+            value_pred = tf.squeeze(self.critic(states, training=True), axis=-1)
             value_loss = tf.reduce_mean(tf.square(returns - value_pred))
 
-            entropy = tf.reduce_mean(dist.entropy())
+            entropy = tf.reduce_mean(tf.reduce_sum(dist.entropy(), axis=-1))
 
             total_loss = policy_loss + self.value_coef * value_loss - self.entropy_coef * entropy
 
-        grads = tape.gradient(total_loss, self.actor.trainable_variables + self.critic.trainable_variables)
-        self.optimizer.apply_gradients(zip(grads, self.actor.trainable_variables + self.critic.trainable_variables))
+        variables = self.actor.trainable_variables + self.critic.trainable_variables
+        grads = tape.gradient(total_loss, variables)
+        self.optimizer.apply_gradients(zip(grads, variables))
+        return total_loss
+
+    def train(self, states, actions, rewards, next_states, dones, log_probs=None):
+        # Arrays are time-major: (T, ...) for one stream of concatenated episodes, or
+        # (T, num_envs, ...) for lockstep environments. log_probs are the behaviour policy's
+        # log-probabilities from get_actions_and_log_probs; without them they are taken from
+        # the current actor before the first update.
+        start = time.perf_counter()
+        rewards = np.asarray(rewards, dtype=np.float32)
+        dones = np.asarray(dones, dtype=np.float32)
+        states = np.asarray(states, dtype=np.float32).reshape(-1, self.state_size)
+        next_states = np.asarray(next_states, dtype=np.float32).reshape(-1, self.state_size)
+        actions = np.asarray(actions, dtype=np.float32).reshape(-1, self.action_size)
+        num_samples = len(states)
+
+        # One critic pass over states and next states, then GAE along the time axis
+        values = self.critic(np.concatenate([states, next_states]), training=False).numpy().reshape(2, *rewards.shape)
+        advantages = compute_gae(rewards, values[0], values[1], dones, self.gamma, self.gae_lambda)
+        returns = (advantages + values[0]).reshape(-1)
+        advantages = advantages.reshape(-1)
+
+        # Normalize advantages
+        advantages = (advantages - np.mean(advantages)) / (np.std(advantages) + 1e-8)
 
-        return total_loss.numpy()
+        if log_probs is None:
+            log_probs = self._log_probs(states, actions)
+        log_probs = np.asarray(log_probs, dtype=np.float32).reshape(-1)
+
+        # Several passes of shuffled minibatches over the same rollout
+        losses = []
+        minibatch_size = min(self.minibatch_size, num_samples)
+        for _ in range(self.train_epochs):
+            order = self.rng.permutation(num_samples)
+            for begin in range(0, num_samples - minibatch_size + 1, minibatch_size):
+                batch = order[begin:begin + minibatch_size]
+                loss = self._train_step(states[batch], actions[batch], log_probs[batch],
+                                        advantages[batch], returns[batch])
+                losses.append(loss)
+
+        self.sync_policy()
+        wall_time = time.perf_counter() - start
+        self.last_train_stats = {
+            'samples': num_samples,
+            'gradient_steps': len(losses),
+            'wall_time': wall_time,
+            'samples_per_s': num_samples * self.train_epochs / wall_time
+        }
+        return float(np.mean(losses))
 
     def save(self, actor_path, critic_path):
         self.actor.save_weights(actor_path)
@@ -86,3 +158,63 @@ class PPOAgent:
     def load(self, actor_path, critic_path):
         self.actor.load_weights(actor_path)
         self.critic.load_weights(critic_path)
+        self.sync_policy()
+
+def benchmark_training(num_samples=2048, state_size=9, action_size=3, updates=5):
+    # Wall time per update and samples/s (counting every epoch) on random rollouts
+    agent = PPOAgent(state_size, action_size, seed=0)
+    rng = np.random.default_rng(0)
+    states = rng.normal(size=(num_samples, state_size)).astype(np.float32)
+    next_states = rng.normal(size=(num_samples, state_size)).astype(np.float32)
+    rewards = rng.normal(size=num_samples).astype(np.float32)
+    dones = (np.arange(num_samples) % 24) == 23
+    actions, log_probs = agent.get_actions_and_log_probs(states)
+
+    agent.train(states, actions, rewards, next_states, dones, log_probs)  # Warm up, including tracing
+    wall_times = []
+    for _ in range(updates):
+        agent.train(states, actions, rewards, next_states, dones, log_probs)
+        wall_times.append(agent.last_train_stats['wall_time'])
+    stats = agent.last_train_stats
+    print(f"{num_samples} samples x {agent.train_epochs} epochs, {stats['gradient_steps']} gradient steps per update")
+    print(f"Wall time per update: {np.mean(wall_times):.3f}s, {num_samples * agent.train_epochs / np.mean(wall_times):.0f} samples/s")
+    return wall_times
+
+def benchmark_action_latency(num_calls=1000, batch_size=64, state_size=9, action_size=3):
+    # Per-call latency of single-state actions, p50/p99 in milliseconds: the previous
+    # actor.predict path against the NumPy mirror, plus a batched call per state
+    agent = PPOAgent(state_size, action_size, seed=0)
+    rng = np.random.default_rng(0)
+    states = rng.normal(size=(num_calls, state_size)).astype(np.float32)
+
+    def predict_action(state):
+        mean, std = agent.actor.predict(state.reshape(1, -1), verbose=0)
+        return np.clip(tfp.distributions.Normal(mean, std).sample()[0], 0, 1)
+
+    paths = [
+        ('actor.predict', predict_action, min(num_calls, 100)),
+        ('get_action', agent.get_action, num_calls),
+        ('get_action (deterministic)', lambda state: agent.get_action(state, deterministic=True), num_calls)
+    ]
+    results = {}
+    for name, act, calls in paths:
+        act(states[0])  # Warm up
+        latencies = []
+        for state in states[:calls]:
+            start = time.perf_counter()
+            act(state)
+            latencies.append(time.perf_counter() - start)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        results[name] = (p50, p99)
+        print(f"{name}: p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+
+    start = time.perf_counter()
+    for begin in range(0, num_calls, batch_size):
+        agent.get_actions(states[begin:begin + batch_size])
+    per_state = (time.perf_counter() - start) / num_calls * 1000
+    print(f"get_actions (batch of {batch_size}): {per_state:.4f} ms per state")
+    return results
+
+if __name__ == "__main__":
+    benchmark_training()
+    benchmark_action_latency()
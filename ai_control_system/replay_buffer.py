@@ -0,0 +1,129 @@
+import numpy as np
+
+class ReplayBuffer:
+    # Fixed-capacity ring buffer of transitions held in preallocated NumPy arrays, one array
+    # per field, so memory per transition is just the raw values. Once full, the oldest
+    # transition is overwritten.
+    def __init__(self, capacity, state_size, action_shape=(), action_dtype=np.int64, state_dtype=np.float32, seed=None):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, state_size), dtype=state_dtype)
+        self.actions = np.zeros((capacity,) + tuple(action_shape), dtype=action_dtype)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=state_dtype)
+        self.dones = np.zeros(capacity, dtype=np.bool_)
+        self.position = 0
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        index = self.position
+        self.states[index] = np.ravel(state)
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.next_states[index] = np.ravel(next_state)
+        self.dones[index] = done
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return index
+
+    def _batch(self, indices, weights):
+        return {
+            'states': self.states[indices],
+            'actions': self.actions[indices],
+            'rewards': self.rewards[indices],
+            'next_states': self.next_states[indices],
+            'dones': self.dones[indices],
+            'indices': indices,
+            'weights': weights
+        }
+
+    def sample(self, batch_size):
+        # Uniform sampling with replacement; all importance weights are 1
+        indices = self.rng.integers(0, self.size, size=batch_size)
+        return self._batch(indices, np.ones(batch_size, dtype=np.float32))
+
+class SumTree:
+    # Binary tree of priorities in a flat array: leaves start at index `leaf_offset` and every
+    # internal node holds the sum of its two children. Batched updates and prefix-sum searches
+    # are vectorized and take O(log capacity) steps; update_one handles a single leaf.
+    def __init__(self, capacity):
+        self.leaf_offset = 1 << int(np.ceil(np.log2(max(capacity, 1))))
+        self.nodes = np.zeros(2 * self.leaf_offset, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.nodes[1]
+
+    def update(self, leaf_indices, priorities):
+        nodes = np.asarray(leaf_indices, dtype=np.int64) + self.leaf_offset
+        self.nodes[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        nodes = nodes[nodes >= 1]
+        while len(nodes):
+            self.nodes[nodes] = self.nodes[2 * nodes] + self.nodes[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+            nodes = nodes[nodes >= 1]
+
+    def update_one(self, leaf_index, priority):
+        # Single-leaf update with plain ints, for the per-transition add path: adds the change
+        # in priority to each ancestor instead of re-summing whole levels
+        node = int(leaf_index) + self.leaf_offset
+        delta = float(priority) - self.nodes[node]
+        nodes = self.nodes
+        while node >= 1:
+            nodes[node] += delta
+            node //= 2
+
+    def find(self, values):
+        # Leaf index whose cumulative priority range contains each value
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaf_offset:
+            left = 2 * nodes
+            left_sums = self.nodes[left]
+            go_right = values >= left_sums
+            values = np.where(go_right, values - left_sums, values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.leaf_offset
+
+    def leaf_priorities(self, leaf_indices):
+        return self.nodes[np.asarray(leaf_indices) + self.leaf_offset]
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    # Proportional prioritized replay: transition i is drawn with probability p_i^alpha / sum,
+    # and its importance weight (N * P(i))^-beta is normalized by the batch maximum. New
+    # transitions get the highest priority seen so far, so each is replayed at least once.
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, beta_increment=1e-4, epsilon=1e-6, **kwargs):
+        super().__init__(capacity, state_size, **kwargs)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+
+    def add(self, state, action, reward, next_state, done):
+        index = super().add(state, action, reward, next_state, done)
+        self.tree.update_one(index, self.max_priority ** self.alpha)
+        return index
+
+    def sample(self, batch_size):
+        # Stratified sampling: one draw from each of batch_size equal slices of the total priority
+        total = self.tree.total
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        indices = np.minimum(self.tree.find(np.minimum(values, np.nextafter(total, 0))), self.size - 1)
+
+        probabilities = self.tree.leaf_priorities(indices) / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return self._batch(indices, weights)
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
@@ -0,0 +1,192 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+import numpy as np
+from ai_control_system.numpy_policy import actor_forward, gaussian_log_probs, random_actor_weights, sample_actions
+
+# Single-threaded math libraries in each worker, so N workers use N cores
+WORKER_THREAD_ENV = {'OMP_NUM_THREADS': '1', 'MKL_NUM_THREADS': '1', 'OPENBLAS_NUM_THREADS': '1'}
+
+class RolloutWorkerError(RuntimeError):
+    pass
+
+def _rollout_worker(worker_id, task_queue, result_queue, env_kwargs, seed):
+    # Any failure, including the imports and building the env, is sent back as an error record
+    # so collect() can raise it instead of waiting for episodes that will never arrive
+    try:
+        _run_rollouts(worker_id, task_queue, result_queue, env_kwargs, seed)
+    except BaseException:
+        result_queue.put({'worker_id': worker_id, 'error': traceback.format_exc()})
+        raise
+
+def _run_rollouts(worker_id, task_queue, result_queue, env_kwargs, seed):
+    # Each worker owns a FacadeEnv and a read-only copy of the actor weights, acting with the
+    # NumPy actor so it never imports TensorFlow
+    from ai_control_system.facade_env import FacadeEnv
+
+    env = FacadeEnv(**env_kwargs)
+    rng = np.random.default_rng(seed)
+    weights = None
+    version = -1
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_version, new_weights, num_episodes = task
+        if new_weights is not None:
+            weights, version = new_weights, task_version
+
+        for _ in range(num_episodes):
+            start = time.perf_counter()
+            states, actions, log_probs, rewards, next_states, dones = [], [], [], [], [], []
+            energy_use, comfort_score = [], []
+            state = env.reset()
+            for _ in range(env.max_steps):
+                mean, std = actor_forward(weights, state[np.newaxis])
+                action = sample_actions(mean, std, rng)[0]
+                log_probs.append(gaussian_log_probs(action, mean[0], std[0]))
+                next_state, reward, done, _ = env.step(action)
+
+                states.append(state)
+                actions.append(action)
+                rewards.append(reward)
+                next_states.append(next_state)
+                dones.append(done)
+                energy_use.append(env.current_energy_use)
+                comfort_score.append(env.current_comfort_score)
+
+                state = next_state
+                if done:
+                    break
+
+            # Stream each episode back as soon as it finishes
+            result_queue.put({
+                'worker_id': worker_id,
+                'weights_version': version,
+                'states': np.array(states, dtype=np.float32),
+                'actions': np.array(actions, dtype=np.float32),
+                'log_probs': np.array(log_probs, dtype=np.float32),
+                'rewards': np.array(rewards, dtype=np.float32),
+                'next_states': np.array(next_states, dtype=np.float32),
+                'dones': np.array(dones),
+                'energy_use': energy_use,
+                'comfort_score': comfort_score,
+                'duration': time.perf_counter() - start
+            })
+
+class RolloutWorkerPool:
+    # Learner-side handle on a pool of rollout worker processes. The learner pushes actor
+    # weights with set_weights(); they are shipped to each worker with its next task, once
+    # per version. collect() hands out episodes and yields them as they arrive.
+    def __init__(self, num_workers=None, env_kwargs=None, seed=0):
+        self.num_workers = num_workers or os.cpu_count()
+        ctx = mp.get_context('spawn')  # Fork is unsafe once TensorFlow is loaded in the learner
+        self.result_queue = ctx.Queue()
+        self.task_queues = []
+        self.processes = []
+        self._weights = None
+        self._version = 0
+        self._worker_versions = [None] * self.num_workers
+
+        saved_env = {name: os.environ.get(name) for name in WORKER_THREAD_ENV}
+        os.environ.update(WORKER_THREAD_ENV)
+        try:
+            for worker_id in range(self.num_workers):
+                task_queue = ctx.Queue()
+                process = ctx.Process(
+                    target=_rollout_worker,
+                    args=(worker_id, task_queue, self.result_queue, env_kwargs or {}, seed + worker_id)
+                )
+                process.daemon = True
+                process.start()
+                self.task_queues.append(task_queue)
+                self.processes.append(process)
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    def set_weights(self, weights):
+        self._weights = [np.array(w, dtype=np.float32) for w in weights]
+        self._version += 1
+
+    def collect(self, num_episodes, timeout=None, poll_interval=1.0):
+        # timeout bounds the wait for each episode. Worker errors are re-raised here, and a
+        # worker that exits without reporting (e.g. killed) raises RolloutWorkerError too.
+        if self._weights is None:
+            raise RuntimeError("set_weights must be called before collecting rollouts")
+
+        # Spread episodes as evenly as possible over the workers
+        per_worker = [num_episodes // self.num_workers + (i < num_episodes % self.num_workers)
+                      for i in range(self.num_workers)]
+        for worker_id, episodes in enumerate(per_worker):
+            if episodes == 0:
+                continue
+            stale = self._worker_versions[worker_id] != self._version
+            self.task_queues[worker_id].put((self._version, self._weights if stale else None, episodes))
+            self._worker_versions[worker_id] = self._version
+
+        for _ in range(num_episodes):
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                try:
+                    result = self.result_queue.get(timeout=poll_interval)
+                    break
+                except queue.Empty:
+                    dead_worker = self._dead_worker(per_worker)
+                    if dead_worker is not None:
+                        # Its error record may still be in flight; prefer it to the bare exit code
+                        try:
+                            result = self.result_queue.get(timeout=poll_interval)
+                            break
+                        except queue.Empty:
+                            process = self.processes[dead_worker]
+                            raise RolloutWorkerError(f"Rollout worker {dead_worker} exited with code {process.exitcode}")
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError(f"No rollout received from workers within {timeout}s")
+            if 'error' in result:
+                raise RolloutWorkerError(f"Rollout worker {result['worker_id']} failed:\n{result['error']}")
+            yield result
+
+    def _dead_worker(self, per_worker):
+        # A worker that was given episodes but is no longer running
+        for worker_id, process in enumerate(self.processes):
+            if per_worker[worker_id] and not process.is_alive():
+                return worker_id
+        return None
+
+    def close(self):
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+def benchmark_rollouts(worker_counts=None, episodes_per_worker=4, state_size=9, action_size=3):
+    # Episodes per second for increasing worker counts, with random actor weights
+    worker_counts = worker_counts or sorted({1, 2, 4, os.cpu_count()})
+    weights = random_actor_weights(state_size, action_size, seed=0)
+    results = []
+    for num_workers in worker_counts:
+        pool = RolloutWorkerPool(num_workers)
+        try:
+            pool.set_weights(weights)
+            list(pool.collect(num_workers))  # Warm up: imports and env construction
+            start = time.perf_counter()
+            episodes = list(pool.collect(num_workers * episodes_per_worker))
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.close()
+        steps = sum(len(episode['rewards']) for episode in episodes)
+        results.append({'workers': num_workers, 'episodes_per_s': len(episodes) / elapsed, 'steps_per_s': steps / elapsed})
+        print(f"{num_workers:>3} workers: {len(episodes) / elapsed:.2f} episodes/s, {steps / elapsed:.1f} steps/s")
+    return results
+
+if __name__ == "__main__":
+    benchmark_rollouts()
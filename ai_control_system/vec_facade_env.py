@@ -0,0 +1,155 @@
+from gym import spaces
+import numpy as np
+from data_acquisition.fetch_data import load_config
+from data_acquisition.weather_provider import get_weather_provider
+from revit_integration.energy_backends import create_energy_backend
+from simulation.physics_simulation import PhysicsSimulator, check_panel_transitions_batch
+from ai_control_system.facade_env import MAX_DEPTH_CHANGE_SPEED, MAX_ROTATION_SPEED, calculate_wind_force, comfort_scores, weather_observation
+
+MAX_PANELS = 20  # Upper end of the 10-20 panel action range
+
+class VecFacadeEnv:
+    # Runs num_envs façade environments in lockstep. Actions, panel physics, constraint
+    # checks and rewards are computed on (num_envs, ...) arrays, and observations are
+    # returned stacked as a (num_envs, 9) matrix. All environments share the site weather,
+    # which is fetched once per step for the whole batch.
+    def __init__(self, num_envs, step_duration=10, physics_substeps=10, energy_backend=None):
+        self.num_envs = num_envs
+        self.config = load_config()
+        self.weather_provider = get_weather_provider(self.config)
+        self.energy_backend = energy_backend if energy_backend is not None else create_energy_backend(self.config)
+        self.physics_simulator = PhysicsSimulator(mass=10, spring_constant=100, damping_coefficient=5)
+        self.step_duration = step_duration
+        self.physics_substeps = physics_substeps
+
+        # Per-environment spaces, matching FacadeEnv
+        self.action_space = spaces.Box(low=0, high=1, shape=(3,), dtype=np.float32)
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(9,), dtype=np.float32)
+
+        self.current_states = None
+        self.current_energy_use = None
+        self.current_comfort_score = None
+        self.step_count = 0
+        self.max_steps = 24  # 24 hours in a day
+
+        # Padded (num_envs, MAX_PANELS) panel state; slots beyond panel_counts are unused
+        self.panel_counts = None
+        self.panel_positions = None
+        self.panel_velocities = None
+        self.panel_rotations = None
+        self.last_wind_force = None
+
+    def reset(self):
+        self.step_count = 0
+        self.weather_provider.start_episode()
+        weather_obs, _ = self._get_weather()
+        facade_obs = np.zeros((self.num_envs, 3), dtype=np.float32)
+        self.current_states = np.concatenate([np.tile(weather_obs, (self.num_envs, 1)), facade_obs], axis=1)
+        self.current_energy_use = np.full(self.num_envs, np.nan)
+        self.current_comfort_score = np.full(self.num_envs, np.nan)
+        self.panel_counts = None
+        self.panel_positions = None
+        self.panel_velocities = None
+        self.panel_rotations = None
+        self.last_wind_force = None
+        return self.current_states.copy()
+
+    def step(self, actions):
+        self.step_count += 1
+        self.weather_provider.advance()
+
+        # Apply the actions (façade adjustments)
+        panel_counts, rotations, depths = self._apply_actions(actions)
+        mask = np.arange(MAX_PANELS) < panel_counts[:, np.newaxis]
+
+        # Run physics simulation for every panel of every environment at once
+        weather_obs, wind_force = self._get_weather()
+        previous_positions, previous_velocities, previous_rotations = self._previous_panels(panel_counts, rotations, depths)
+        positions, velocities = self.physics_simulator.advance_panels(
+            previous_positions,
+            previous_velocities,
+            rest_positions=depths[:, np.newaxis],
+            force=wind_force,
+            duration=self.step_duration,
+            substeps=self.physics_substeps,
+            initial_force=self.last_wind_force
+        )
+        self.last_wind_force = wind_force
+
+        # Check physical constraints on each panel's rate of change over the step, as FacadeEnv does
+        passed = check_panel_transitions_batch(previous_rotations, rotations[:, np.newaxis], previous_positions, positions,
+                                               self.step_duration, mask, MAX_ROTATION_SPEED, MAX_DEPTH_CHANGE_SPEED)
+
+        # Environments that violate constraints are penalized and keep their previous state
+        new_states = self.current_states.copy()
+        rewards = np.full(self.num_envs, -1000.0)
+        if passed.any():
+            self._commit_panels(passed, panel_counts, rotations, positions, velocities)
+            counts = panel_counts[passed]
+            facade_obs = np.stack([
+                rotations[passed],
+                np.sum(np.where(mask[passed], positions[passed], 0), axis=1) / counts,
+                counts
+            ], axis=1)
+            new_states[passed] = np.concatenate([np.tile(weather_obs, (len(counts), 1)), facade_obs], axis=1)
+            rewards[passed] = self._calculate_rewards(new_states[passed], passed)
+
+        dones = np.full(self.num_envs, self.step_count >= self.max_steps)
+        self.current_states = new_states
+
+        return new_states.copy(), rewards, dones, [{} for _ in range(self.num_envs)]
+
+    def _apply_actions(self, actions):
+        # Convert a (num_envs, 3) action matrix to façade adjustments
+        actions = np.clip(np.asarray(actions, dtype=np.float64).reshape(self.num_envs, 3), 0, 1)
+        panel_counts = (10 + actions[:, 0] * 10).astype(int)  # Range: 10-20 panels
+        rotations = actions[:, 1] * 90  # Range: 0-90 degrees
+        depths = 0.1 + actions[:, 2] * 0.4  # Range: 0.1-0.5 meters
+        return panel_counts, rotations, depths
+
+    def _previous_panels(self, panel_counts, rotations, depths):
+        # Panel state at the start of the step. Panels added since the last step start at
+        # rest at their commanded depth and rotation, as in FacadeEnv.
+        positions = np.tile(depths[:, np.newaxis], (1, MAX_PANELS))
+        velocities = np.zeros((self.num_envs, MAX_PANELS))
+        previous_rotations = np.tile(rotations[:, np.newaxis], (1, MAX_PANELS))
+        if self.panel_counts is not None:
+            kept = np.arange(MAX_PANELS) < np.minimum(panel_counts, self.panel_counts)[:, np.newaxis]
+            positions = np.where(kept, self.panel_positions, positions)
+            velocities = np.where(kept, self.panel_velocities, velocities)
+            previous_rotations = np.where(kept, self.panel_rotations, previous_rotations)
+        return positions, velocities, previous_rotations
+
+    def _commit_panels(self, passed, panel_counts, rotations, positions, velocities):
+        if self.panel_counts is None:
+            self.panel_counts = np.zeros(self.num_envs, dtype=int)
+            self.panel_positions = np.zeros((self.num_envs, MAX_PANELS))
+            self.panel_velocities = np.zeros((self.num_envs, MAX_PANELS))
+            self.panel_rotations = np.zeros((self.num_envs, MAX_PANELS))
+        self.panel_counts[passed] = panel_counts[passed]
+        self.panel_positions[passed] = positions[passed]
+        self.panel_velocities[passed] = velocities[passed]
+        self.panel_rotations[passed] = rotations[passed, np.newaxis]
+
+    def _get_weather(self):
+        weather_data = self.weather_provider.get()
+        return weather_observation(weather_data), calculate_wind_force(weather_data['wind']['speed'])
+
+    def _calculate_rewards(self, states, env_mask):
+        simulation_results = self.energy_backend.evaluate(states)
+        new_energy_use = simulation_results['annual_energy_use']
+        new_comfort_score = comfort_scores(simulation_results['indoor_temperature'], simulation_results['indoor_humidity'])
+
+        # No reward on the first evaluated step of an environment, as in FacadeEnv
+        current_energy_use = self.current_energy_use[env_mask]
+        current_comfort_score = self.current_comfort_score[env_mask]
+        first_step = np.isnan(current_energy_use) | np.isnan(current_comfort_score)
+        energy_reward = np.where(first_step, 0, current_energy_use - new_energy_use)
+        comfort_reward = np.where(first_step, 0, new_comfort_score - current_comfort_score)
+
+        self.current_energy_use[env_mask] = new_energy_use
+        self.current_comfort_score[env_mask] = new_comfort_score
+
+        # Combine energy and comfort rewards (you can adjust the weights)
+        return 0.7 * energy_reward + 0.3 * comfort_reward
+
@@ -1,17 +1,73 @@
 from flask import Flask, render_template, jsonify
-from main_controller import MainController
 import threading
 import time
 import numpy as np
+from data_acquisition.fetch_data import load_config
+from lazy_loading import optional_import
 
 app = Flask(__name__)
 
-controller = MainController()
+# The controller (TensorFlow, the environment, the visualizer) is built on a background thread,
+# so the dashboard is up immediately and serves the history saved by earlier runs until then
+controller = None
+SAVED_HISTORY_WINDOW = 24 * 3600  # seconds of stored history shown while starting
+SAVED_HISTORY_TTL = 30  # seconds before stored history is read again
+_saved_history = {}
+_history_store = None
+
+def _run_controller():
+    global controller
+    try:
+        from main_controller import MainController
+        controller = MainController()
+    except Exception as error:
+        print(f"Controller failed to start, serving saved history only: {error}")
+        return
+    controller.run()
+
+def start_controller():
+    control_thread = threading.Thread(target=_run_controller)
+    control_thread.daemon = True
+    control_thread.start()
+    return control_thread
+
+def history_store():
+    # The store MainController writes to, from the same config; None without pyarrow
+    global _history_store
+    if _history_store is None:
+        columnar_store = optional_import('data_acquisition.columnar_store', 'Saved dashboard history')
+        if columnar_store is None:
+            return None
+        try:
+            storage_dir = load_config().get('storage_dir', columnar_store.DEFAULT_STORE_DIR)
+        except OSError:
+            storage_dir = columnar_store.DEFAULT_STORE_DIR
+        _history_store = columnar_store.ColumnarStore(storage_dir)
+    return _history_store
+
+def saved_history(name):
+    # The last day of rows stored by MainController, read without pandas and re-read every
+    # SAVED_HISTORY_TTL seconds so rows written by other runs show up; [] if there is no store
+    loaded_at, rows = _saved_history.get(name, (None, None))
+    if loaded_at is None or time.time() - loaded_at > SAVED_HISTORY_TTL:
+        store = history_store()
+        rows = []
+        if store is not None:
+            try:
+                table = store.read_table(name, start_time=time.time() - SAVED_HISTORY_WINDOW)
+                rows = sorted(table.drop(['date']).to_pylist(), key=lambda row: row['time'])
+            except Exception as error:
+                print(f"Could not read saved {name} history: {error}")
+        _saved_history[name] = (time.time(), rows)
+    return rows
+
+def history(name):
+    if controller is not None:
+        return getattr(controller, f'{name}_data')
+    return saved_history(name)
 
 # Start the main control loop in a separate thread
-control_thread = threading.Thread(target=controller.run)
-control_thread.daemon = True
-control_thread.start()
+start_controller()
 
 @app.route('/')
 def index():
@@ -19,33 +75,37 @@ def index():
 
 @app.route('/api/facade_data')
 def get_facade_data():
-    return jsonify(controller.facade_data)
+    return jsonify(history('facade'))
 
 @app.route('/api/energy_data')
 def get_energy_data():
-    return jsonify(controller.energy_data)
+    return jsonify(history('energy'))
 
 @app.route('/api/comfort_data')
 def get_comfort_data():
-    return jsonify(controller.comfort_data)
+    return jsonify(history('comfort'))
 
 @app.route('/api/current_status')
 def get_current_status():
+    facade_data, energy_data, comfort_data = history('facade'), history('energy'), history('comfort')
     return jsonify({
         'last_update': time.time(),
-        'panel_count': len(controller.facade_data),
-        'energy_use': controller.energy_data[-1]['energy_use'] if controller.energy_data else None,
-        'temperature': controller.energy_data[-1]['temperature'] if controller.energy_data else None,
-        'humidity': controller.energy_data[-1]['humidity'] if controller.energy_data else None,
-        'comfort_score': controller.comfort_data[-1]['comfort_score'] if controller.comfort_data else None,
+        'panel_count': len(facade_data),
+        'energy_use': energy_data[-1]['energy_use'] if energy_data else None,
+        'temperature': energy_data[-1]['temperature'] if energy_data else None,
+        'humidity': energy_data[-1]['humidity'] if energy_data else None,
+        'comfort_score': comfort_data[-1]['comfort_score'] if comfort_data else None,
     })
 
 @app.route('/api/rl_performance')
 def get_rl_performance():
+    if controller is None:
+        return jsonify({'status': 'starting'}), 503
+    
     # Get the latest action from the PPO agent
     state = controller.env.current_state
     if state is not None:
-        action = controller.agent.get_action(state)
+        action = controller.agent.get_action(state, deterministic=True)
     else:
         action = np.zeros(controller.agent.action_size)
 
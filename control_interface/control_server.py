@@ -1,8 +1,9 @@
 import asyncio
 import websockets
 import json
-from ai_control_system.inference import get_facade_adjustments
-from data_acquisition.fetch_data import fetch_weather_data, load_config
+from ai_control_system.inference import get_facade_adjustments_with_version
+from data_acquisition.fetch_data import load_config
+from data_acquisition.weather_provider import get_weather_provider
 
 class FacadeControlServer:
     def __init__(self, host='localhost', port=8765):
@@ -10,6 +11,7 @@ class FacadeControlServer:
         self.port = port
         self.clients = set()
         self.config = load_config()
+        self.weather_provider = get_weather_provider(self.config)
 
     async def register(self, websocket):
         self.clients.add(websocket)
@@ -19,14 +21,15 @@ class FacadeControlServer:
         self.clients.remove(websocket)
         print(f"Client disconnected. Total clients: {len(self.clients)}")
 
-    async def send_adjustments(self, websocket, adjustments):
+    async def send_adjustments(self, websocket, adjustments, model_version=None):
         message = json.dumps({
             "type": "facade_adjustments",
             "data": {
                 "adjustment_1": float(adjustments[0]),
                 "adjustment_2": float(adjustments[1]),
                 "adjustment_3": float(adjustments[2])
-            }
+            },
+            "model_version": model_version
         })
         await websocket.send(message)
 
@@ -36,9 +39,9 @@ class FacadeControlServer:
             async for message in websocket:
                 data = json.loads(message)
                 if data['type'] == 'request_adjustments':
-                    weather_data = fetch_weather_data(self.config['openweathermap_api_key'], self.config['city'])
-                    adjustments = get_facade_adjustments(weather_data)
-                    await self.send_adjustments(websocket, adjustments)
+                    weather_data = self.weather_provider.get()
+                    adjustments, model_version = get_facade_adjustments_with_version(weather_data)
+                    await self.send_adjustments(websocket, adjustments, model_version)
         finally:
             await self.unregister(websocket)
 
@@ -0,0 +1,190 @@
+import glob
+import os
+import re
+import time
+import uuid
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# Parquet storage for processed weather and controller history. Each dataset lives in its own
+# directory, hive-partitioned by day (and by city for weather):
+#   <root>/weather/date=2023-05-01/city=New_York/part-<id>-0.parquet
+#   <root>/facade/date=2023-05-01/part-<id>-0.parquet
+# Reads project only the requested columns and prune partitions from the time and city
+# filters before any file is opened; row-level filters are pushed down into the Parquet scan.
+
+DEFAULT_STORE_DIR = 'data_acquisition/data/store'
+
+SCHEMAS = {
+    'weather': pa.schema([
+        ('time', pa.float64()),  # Unix seconds; null for processed files without timestamps
+        ('temperature', pa.float64()),
+        ('humidity', pa.float64()),
+        ('wind_speed', pa.float64()),
+        ('wind_direction', pa.float64()),
+        ('cloudiness', pa.float64()),
+        ('weather_condition', pa.string())
+    ]),
+    'facade': pa.schema([
+        ('time', pa.float64()),
+        ('temperature', pa.float64()),
+        ('humidity', pa.float64()),
+        ('wind_speed', pa.float64()),
+        ('wind_direction', pa.float64()),
+        ('cloudiness', pa.float64()),
+        ('weather_condition', pa.float64()),
+        ('panel_count', pa.int32()),
+        ('rotation', pa.float64()),
+        ('depth', pa.float64())
+    ]),
+    'energy': pa.schema([
+        ('time', pa.float64()),
+        ('energy_use', pa.float64()),
+        ('temperature', pa.float64()),
+        ('humidity', pa.float64())
+    ]),
+    'comfort': pa.schema([
+        ('time', pa.float64()),
+        ('comfort_score', pa.float64())
+    ])
+}
+
+# Partition columns per dataset, outermost first
+PARTITIONS = {
+    'weather': [('date', pa.string()), ('city', pa.string())],
+    'facade': [('date', pa.string())],
+    'energy': [('date', pa.string())],
+    'comfort': [('date', pa.string())]
+}
+
+def day_of(timestamp):
+    return time.strftime('%Y-%m-%d', time.gmtime(timestamp))
+
+class ColumnarStore:
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+
+    def _path(self, dataset):
+        if dataset not in SCHEMAS:
+            raise ValueError(f"Unknown dataset {dataset!r}; expected one of {sorted(SCHEMAS)}")
+        return os.path.join(self.root, dataset)
+
+    def _partitioning(self, dataset):
+        return ds.partitioning(pa.schema(PARTITIONS[dataset]), flavor='hive')
+
+    def full_schema(self, dataset):
+        schema = SCHEMAS[dataset]
+        for field in PARTITIONS[dataset]:
+            schema = schema.append(pa.field(*field))
+        return schema
+
+    def append(self, dataset, rows, city=None, date=None):
+        # rows: a DataFrame, a list of dicts or a pyarrow Table. Columns are cast to the
+        # dataset schema (missing ones become null, extra ones are dropped). The day partition
+        # comes from each row's time, or from `date` for rows without one.
+        path = self._path(dataset)
+        schema = SCHEMAS[dataset]
+        if isinstance(rows, list):
+            table = pa.Table.from_pylist(rows)
+        elif isinstance(rows, pa.Table):
+            table = rows
+        else:
+            table = pa.Table.from_pandas(rows, preserve_index=False)
+        if table.num_rows == 0:
+            return 0
+
+        columns = [table[field.name].cast(field.type) if field.name in table.column_names
+                   else pa.nulls(table.num_rows, field.type) for field in schema]
+        table = pa.Table.from_arrays(columns, schema=schema)
+
+        times = table['time'].to_pylist()
+        if date is None and any(timestamp is None for timestamp in times):
+            raise ValueError(f"Rows without a time need an explicit date to be stored in {dataset}")
+        days = [day_of(timestamp) if timestamp is not None else date for timestamp in times]
+        table = table.append_column('date', pa.array(days, pa.string()))
+        if 'city' in dict(PARTITIONS[dataset]):
+            if city is None:
+                raise ValueError(f"Dataset {dataset} is partitioned by city; pass city=")
+            table = table.append_column('city', pa.array([city] * table.num_rows, pa.string()))
+
+        # A unique file name per call, so appends never overwrite earlier parts
+        ds.write_dataset(table, path, format='parquet', partitioning=self._partitioning(dataset),
+                         basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                         existing_data_behavior='overwrite_or_ignore')
+        return table.num_rows
+
+    def _filter(self, dataset, start_time=None, end_time=None, cities=None, start_date=None, end_date=None, where=None):
+        # Partition bounds from the time range, days and cities, plus the row-level conditions
+        conditions = []
+        if start_date is not None:
+            conditions.append(ds.field('date') >= start_date)
+        if end_date is not None:
+            conditions.append(ds.field('date') <= end_date)
+        if start_time is not None:
+            conditions.append(ds.field('date') >= day_of(start_time))
+            conditions.append(ds.field('time') >= start_time)
+        if end_time is not None:
+            conditions.append(ds.field('date') <= day_of(end_time))
+            conditions.append(ds.field('time') < end_time)
+        if cities is not None:
+            if 'city' not in dict(PARTITIONS[dataset]):
+                raise ValueError(f"Dataset {dataset} is not partitioned by city")
+            conditions.append(ds.field('city').isin(list(cities)))
+        if where is not None:
+            conditions.append(where)
+        if not conditions:
+            return None
+        expression = conditions[0]
+        for condition in conditions[1:]:
+            expression = expression & condition
+        return expression
+
+    def read_table(self, dataset, columns=None, start_time=None, end_time=None, cities=None,
+                   start_date=None, end_date=None, where=None):
+        # Arrow table of the requested columns. start_date/end_date ('YYYY-MM-DD', inclusive)
+        # select whole days, which also covers rows stored without a time. `where` takes any
+        # extra pyarrow.dataset expression, e.g. ds.field('temperature') > 30.
+        path = self._path(dataset)
+        schema = self.full_schema(dataset)
+        if not os.path.isdir(path):
+            if columns is not None:
+                schema = pa.schema([schema.field(column) for column in columns])
+            return schema.empty_table()
+
+        expression = self._filter(dataset, start_time, end_time, cities, start_date, end_date, where)
+        dataset_files = ds.dataset(path, format='parquet', partitioning=self._partitioning(dataset), schema=schema)
+        return dataset_files.to_table(columns=columns, filter=expression)
+
+    def read(self, dataset, columns=None, **query):
+        # read_table as a pandas DataFrame, sorted by time when time is present
+        data = self.read_table(dataset, columns, **query).to_pandas()
+        if 'time' in data and len(data):
+            data = data.sort_values('time', kind='stable').reset_index(drop=True)
+        return data
+
+    def import_csv(self, dataset, csv_path, city=None, date=None, chunksize=100000):
+        # Copies a CSV into the store chunk by chunk. For processed weather files named
+        # <City>_<YYYYMMDD>.csv the city and date are taken from the name when not given.
+        import pandas as pd
+
+        match = re.match(r'(.+)_(\d{4})(\d{2})(\d{2})\.csv$', os.path.basename(csv_path))
+        if match:
+            city = city or match.group(1)
+            date = date or f"{match.group(2)}-{match.group(3)}-{match.group(4)}"
+        rows = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            rows += self.append(dataset, chunk, city=city, date=date)
+        return rows
+
+def import_processed_weather(data_dir='data_acquisition/data/processed', store=None):
+    # One-off migration of the processed weather CSVs into the store
+    store = store or ColumnarStore()
+    total = 0
+    for csv_path in sorted(glob.glob(os.path.join(data_dir, '*.csv'))):
+        rows = store.import_csv('weather', csv_path)
+        total += rows
+        print(f"Imported {rows} rows from {csv_path}")
+    return total
+
+if __name__ == "__main__":
+    import_processed_weather()
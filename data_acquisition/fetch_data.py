@@ -1 +1,200 @@
- 
\ No newline at end of file
+import asyncio
+import random
+import threading
+import time
+import yaml
+
+CONFIG_PATH = 'data_acquisition/config.yaml'
+
+def load_config(path=CONFIG_PATH):
+    # Settings shared by every subsystem; an empty file gives an empty dict
+    with open(path) as config_file:
+        return yaml.safe_load(config_file) or {}
+
+def _openweathermap_params(api_key, city):
+    return {'q': city, 'appid': api_key, 'units': 'metric'}
+
+def _openweathermap_record(city, data):
+    return {
+        'city': city,
+        'time': float(data.get('dt', time.time())),
+        'temperature': data['main']['temp'],
+        'humidity': data['main']['humidity'],
+        'wind_speed': data['wind']['speed'],
+        'wind_direction': data['wind'].get('deg', 0),
+        'cloudiness': data['clouds']['all'],
+        'weather_condition': data['weather'][0]['main']
+    }
+
+# Weather APIs: endpoint, query builder, normalizer to the weather record columns of
+# data_acquisition.columnar_store, and the request budget as (requests, per seconds)
+PROVIDERS = {
+    'openweathermap': {
+        'url': 'https://api.openweathermap.org/data/2.5/weather',
+        'params': _openweathermap_params,
+        'normalize': _openweathermap_record,
+        'rate_limit': (60, 60)
+    }
+}
+
+# Responses worth retrying; other 4xx errors (bad key, unknown city) fail at once
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class WeatherFetchError(Exception):
+    pass
+
+class RateLimiter:
+    # Token bucket allowing `rate` requests per `per` seconds, with bursts up to `rate`
+    def __init__(self, rate, per=1.0):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * self.per / self.rate)
+
+class AsyncWeatherFetcher:
+    # Fetches current weather for many cities concurrently over one pooled aiohttp session.
+    # Each provider has its own rate limiter, shared by all requests through this fetcher.
+    # Failed requests (timeouts, connection errors, 429 and 5xx) are retried up to `retries`
+    # times with full-jitter exponential backoff, honouring Retry-After when the API sends it.
+    # Use as `async with AsyncWeatherFetcher(api_key) as fetcher: ...`.
+    def __init__(self, api_key, max_connections=20, timeout=10, retries=3, backoff=0.5, max_backoff=30,
+                 rate_limits=None, base_urls=None):
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.base_urls = base_urls or {}
+        self.rate_limiters = {
+            name: RateLimiter(*(rate_limits or {}).get(name, provider['rate_limit']))
+            for name, provider in PROVIDERS.items()
+        }
+        self.session = None
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0}
+
+    async def open(self):
+        import aiohttp
+
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _retry_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def fetch_raw(self, city, provider='openweathermap'):
+        # The provider's response for one city, as parsed JSON
+        import aiohttp
+
+        await self.open()
+        settings = PROVIDERS[provider]
+        url = self.base_urls.get(provider, settings['url'])
+        params = settings['params'](self.api_key, city)
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+            await self.rate_limiters[provider].acquire()
+            self.stats['requests'] += 1
+            retry_after = None
+            try:
+                async with self.session.get(url, params=params) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    body = (await response.text())[:200]
+                    last_error = WeatherFetchError(f"{provider} returned HTTP {response.status} for {city}: {body}")
+                    if response.status not in RETRY_STATUSES:
+                        break
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                last_error = WeatherFetchError(f"{provider} request for {city} failed: {error!r}")
+            if attempt < self.retries:
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+        self.stats['failures'] += 1
+        raise last_error
+
+    async def fetch(self, city, provider='openweathermap'):
+        # One normalized weather record
+        return PROVIDERS[provider]['normalize'](city, await self.fetch_raw(city, provider))
+
+    async def fetch_many(self, cities, provider='openweathermap', normalize=True):
+        # All cities at once, results in the order given. A city that still fails after its
+        # retries appears as its WeatherFetchError instead of a record.
+        fetch = self.fetch if normalize else self.fetch_raw
+        return await asyncio.gather(*(fetch(city, provider) for city in cities), return_exceptions=True)
+
+class _BackgroundFetcher:
+    # Synchronous front end: one event loop on a daemon thread owns a fetcher per API key, so
+    # pooled connections outlive individual calls, and callers that are themselves inside an
+    # event loop (e.g. the control server) can still block on a result
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._fetchers = {}
+
+    def _start(self):
+        self._loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self._loop.run_forever, name='weather-fetcher')
+        thread.daemon = True
+        thread.start()
+
+    def run(self, api_key, method, *args):
+        with self._lock:
+            if self._loop is None:
+                self._start()
+            fetcher = self._fetchers.get(api_key)
+            if fetcher is None:
+                fetcher = self._fetchers[api_key] = AsyncWeatherFetcher(api_key)
+        return asyncio.run_coroutine_threadsafe(getattr(fetcher, method)(*args), self._loop).result()
+
+_background_fetcher = _BackgroundFetcher()
+
+def fetch_weather_data(api_key, city):
+    # Raw OpenWeatherMap response for one city, as the rest of the codebase expects
+    return _background_fetcher.run(api_key, 'fetch_raw', city)
+
+def fetch_weather_records(api_key, cities):
+    # Normalized records for many cities, fetched concurrently; failures are WeatherFetchError
+    return _background_fetcher.run(api_key, 'fetch_many', cities)
+
+if __name__ == "__main__":
+    config = load_config()
+    cities = config.get('cities') or [config['city']]
+    start = time.perf_counter()
+    records = fetch_weather_records(config['openweathermap_api_key'], cities)
+    elapsed = time.perf_counter() - start
+    for city, record in zip(cities, records):
+        print(f"{city}: {record}")
+    print(f"Fetched {len(cities)} cities in {elapsed:.2f}s")
@@ -0,0 +1,129 @@
+import threading
+import time
+from data_acquisition.fetch_data import fetch_weather_data
+from data_acquisition.weather_replay import ReplayWeatherProvider
+
+class WeatherProvider:
+    # Caching front for a weather source (any callable (api_key, city) -> weather dict).
+    #   - Fresh entries (younger than ttl) are served from memory.
+    #   - Stale entries (younger than ttl + stale_ttl) are served immediately while a single
+    #     background refresh runs (stale-while-revalidate).
+    #   - Missing or expired entries are fetched synchronously; concurrent callers for the
+    #     same city wait on one in-flight request instead of issuing their own (single-flight).
+    # If a refresh fails and any previous value exists, that value is served instead.
+    def __init__(self, api_key, city, source=fetch_weather_data, ttl=300, stale_ttl=3600, clock=time.monotonic):
+        self.api_key = api_key
+        self.city = city
+        self.source = source
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._entries = {}  # city -> (fetched_at, weather_data)
+        self._in_flight = {}  # city -> threading.Event set when the fetch finishes
+        self._errors = {}  # city -> exception raised by the last failed fetch
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'fetches': 0, 'errors': 0}
+
+    def get(self, city=None):
+        city = city or self.city
+        with self._lock:
+            entry = self._entries.get(city)
+            age = self.clock() - entry[0] if entry else None
+
+            if entry is not None and age < self.ttl:
+                self.stats['hits'] += 1
+                return entry[1]
+
+            if entry is not None and age < self.ttl + self.stale_ttl:
+                self.stats['stale_hits'] += 1
+                if city not in self._in_flight:
+                    self._start_fetch(city, background=True)
+                return entry[1]
+
+            event = self._in_flight.get(city)
+            if event is None:
+                self.stats['misses'] += 1
+                event = self._start_fetch(city, background=False)
+                leader = True
+            else:
+                self.stats['coalesced'] += 1
+                leader = False
+
+        if leader:
+            self._fetch(city, event)
+        else:
+            event.wait()
+
+        with self._lock:
+            entry = self._entries.get(city)
+            error = self._errors.get(city)
+        if error is not None:
+            if entry is None:
+                raise error
+            print(f"Warning: serving expired weather data for {city}: {error}")
+        return entry[1]
+
+    def start_episode(self):
+        # Live weather has no episodes; present for parity with ReplayWeatherProvider
+        pass
+
+    def advance(self):
+        pass
+
+    def invalidate(self, city=None):
+        with self._lock:
+            self._entries.pop(city or self.city, None)
+
+    def _start_fetch(self, city, background):
+        # Called with the lock held; registers the in-flight request
+        event = threading.Event()
+        self._in_flight[city] = event
+        if background:
+            thread = threading.Thread(target=self._fetch, args=(city, event))
+            thread.daemon = True
+            thread.start()
+        return event
+
+    def _fetch(self, city, event):
+        try:
+            weather_data = self.source(self.api_key, city)
+        except Exception as error:
+            with self._lock:
+                self.stats['errors'] += 1
+                self._errors[city] = error
+        else:
+            with self._lock:
+                self.stats['fetches'] += 1
+                self._entries[city] = (self.clock(), weather_data)
+                self._errors.pop(city, None)
+        finally:
+            with self._lock:
+                self._in_flight.pop(city, None)
+            event.set()
+
+_shared_providers = {}
+_shared_providers_lock = threading.Lock()
+
+def get_weather_provider(config):
+    # 'weather_source: replay' selects recorded history. Replay providers hold per-episode
+    # state, so each caller gets its own.
+    if config.get('weather_source', 'live') == 'replay':
+        return ReplayWeatherProvider(
+            data_dir=config.get('weather_replay_dir', 'data_acquisition/data/processed'),
+            window_length=config.get('weather_replay_window', 25),
+            seed=config.get('weather_replay_seed')
+        )
+
+    # One live provider per (api key, city) per process, so every subsystem shares the cache
+    key = (config['openweathermap_api_key'], config['city'])
+    with _shared_providers_lock:
+        provider = _shared_providers.get(key)
+        if provider is None:
+            provider = WeatherProvider(
+                config['openweathermap_api_key'],
+                config['city'],
+                ttl=config.get('weather_cache_ttl', 300),
+                stale_ttl=config.get('weather_stale_ttl', 3600)
+            )
+            _shared_providers[key] = provider
+    return provider
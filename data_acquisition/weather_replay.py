@@ -0,0 +1,109 @@
+import glob
+import os
+import time
+import numpy as np
+
+# Column order of the replay array; matches the processed CSVs used by ai_control_system/model.py
+REPLAY_COLUMNS = ['temperature', 'humidity', 'wind_speed', 'wind_direction', 'cloudiness', 'weather_condition']
+WEATHER_CONDITIONS = ['Clear', 'Clouds', 'Rain', 'Snow']
+
+def build_weather_history(data_dir, history_path, index_path):
+    # Converts the processed CSVs into one column-major float32 array, (columns, rows),
+    # plus an index of (start, stop) row ranges, one per source file
+    import pandas as pd
+
+    weather_mapping = {condition: code for code, condition in enumerate(WEATHER_CONDITIONS)}
+    columns, ranges = [], []
+    start = 0
+    for csv_path in sorted(glob.glob(os.path.join(data_dir, '*.csv'))):
+        data = pd.read_csv(csv_path, usecols=REPLAY_COLUMNS)
+        data['weather_condition'] = data['weather_condition'].map(weather_mapping).fillna(0)
+        columns.append(data[REPLAY_COLUMNS].to_numpy(dtype=np.float32).T)
+        ranges.append((start, start + len(data)))
+        start += len(data)
+
+    if not columns:
+        raise FileNotFoundError(f"No processed weather CSVs found in {data_dir}")
+
+    # History first, index last: a reader that sees the new index also sees the new history
+    _save_atomic(history_path, np.ascontiguousarray(np.concatenate(columns, axis=1)))
+    _save_atomic(index_path, np.array(ranges, dtype=np.int64))
+
+def _save_atomic(path, array):
+    # Written beside the target and renamed over it, so concurrent readers never see a partial
+    # file and existing memory maps keep the old (unlinked) file instead of being truncated
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as array_file:
+        np.save(array_file, array)
+    os.replace(temp_path, path)
+
+def _load_history(history_path, index_path, attempts=5):
+    # The two files are replaced one after the other; retry if another process rebuilt them
+    # between our two loads
+    for _ in range(attempts):
+        history = np.load(history_path, mmap_mode='r')
+        ranges = np.load(index_path)
+        if len(ranges) and ranges[-1, 1] == history.shape[1]:
+            return history, ranges
+        time.sleep(0.1)
+    raise ValueError(f"{index_path} does not match {history_path}; rebuild the weather history")
+
+def _history_is_stale(data_dir, history_path, index_path):
+    if not (os.path.exists(history_path) and os.path.exists(index_path)):
+        return True
+    built_at = min(os.path.getmtime(history_path), os.path.getmtime(index_path))
+    return any(os.path.getmtime(path) > built_at for path in glob.glob(os.path.join(data_dir, '*.csv')))
+
+class ReplayWeatherProvider:
+    # Serves recorded weather instead of live requests. The processed history is memory-mapped
+    # as a (columns, rows) array, and each episode replays a random window of consecutive rows
+    # (one row per environment step) from a single source file. Windows are views into the
+    # memory map, so sampling copies no data. Environments observe one row on reset and advance
+    # before observing each step, so an episode of N steps reads N + 1 rows; the default
+    # window covers the 24-step FacadeEnv episode.
+    def __init__(self, data_dir='data_acquisition/data/processed', window_length=25, seed=None):
+        self.data_dir = data_dir
+        self.window_length = window_length
+        self.rng = np.random.default_rng(seed)
+
+        history_path = os.path.join(data_dir, 'weather_history.npy')
+        index_path = os.path.join(data_dir, 'weather_history_index.npy')
+        if _history_is_stale(data_dir, history_path, index_path):
+            build_weather_history(data_dir, history_path, index_path)
+
+        self.history, ranges = _load_history(history_path, index_path)
+
+        # Every row that can start a full window without crossing into another file
+        lengths = ranges[:, 1] - ranges[:, 0] - window_length + 1
+        usable = lengths > 0
+        if not usable.any():
+            raise ValueError(f"No weather file in {data_dir} has {window_length} rows")
+        self._range_starts = ranges[usable, 0]
+        self._range_lengths = lengths[usable]
+        self._range_offsets = np.concatenate([[0], np.cumsum(self._range_lengths)])
+
+        self.window = None
+        self.position = 0
+        self.start_episode()
+
+    def start_episode(self):
+        # Picks a window uniformly over all valid start rows
+        choice = self.rng.integers(self._range_offsets[-1])
+        file_index = np.searchsorted(self._range_offsets, choice, side='right') - 1
+        start = self._range_starts[file_index] + choice - self._range_offsets[file_index]
+        self.window = self.history[:, start:start + self.window_length]
+        self.position = 0
+        return self.window
+
+    def advance(self):
+        # Moves to the next row; the last row is held if an episode outlasts the window
+        self.position = min(self.position + 1, self.window_length - 1)
+
+    def get(self, city=None):
+        temperature, humidity, wind_speed, wind_direction, cloudiness, condition = self.window[:, self.position].tolist()
+        return {
+            'main': {'temp': temperature, 'humidity': humidity},
+            'wind': {'speed': wind_speed, 'deg': wind_direction},
+            'clouds': {'all': cloudiness},
+            'weather': [{'main': WEATHER_CONDITIONS[int(condition)]}]
+        }
@@ -0,0 +1,95 @@
+import asyncio
+import random
+import time
+from aiohttp import web
+from data_acquisition.fetch_data import AsyncWeatherFetcher, WeatherFetchError
+
+# Local stand-in for the OpenWeatherMap current-weather endpoint, for exercising the fetcher
+# without an API key or network: fixed latency, and a fraction of requests fail with 503 (or
+# 429 with Retry-After) so retries and backoff get used. `statuses` scripts the first
+# responses instead, e.g. [429, 503] fails twice and then serves normally.
+
+CONDITIONS = ['Clear', 'Clouds', 'Rain', 'Snow']
+
+# app[STATS]: requests seen and failures served
+STATS = web.AppKey('stats', dict)
+
+def stub_response(city, rng):
+    return {
+        'name': city,
+        'dt': int(time.time()),
+        'main': {'temp': round(rng.uniform(-10, 35), 1), 'humidity': rng.randint(20, 100)},
+        'wind': {'speed': round(rng.uniform(0, 15), 1), 'deg': rng.randint(0, 359)},
+        'clouds': {'all': rng.randint(0, 100)},
+        'weather': [{'main': rng.choice(CONDITIONS)}]
+    }
+
+def create_stub_app(latency=0.05, failure_rate=0.0, seed=0, statuses=None, retry_after='0.1'):
+    rng = random.Random(seed)
+    scripted = list(statuses or [])
+    app = web.Application()
+    app[STATS] = {'requests': 0, 'failed': 0}
+
+    async def current_weather(request):
+        app[STATS]['requests'] += 1
+        await asyncio.sleep(latency)
+        city = request.query.get('q')
+        if not city or not request.query.get('appid'):
+            return web.json_response({'cod': 400, 'message': 'city and appid are required'}, status=400)
+        if scripted:
+            status = scripted.pop(0)
+        elif rng.random() < failure_rate:
+            status = 429 if rng.random() < 0.5 else 503
+        else:
+            status = 200
+        if status == 200:
+            return web.json_response(stub_response(city, rng))
+        app[STATS]['failed'] += 1
+        headers = {'Retry-After': retry_after} if status == 429 and retry_after is not None else None
+        return web.json_response({'cod': status, 'message': 'stub failure'}, status=status, headers=headers)
+
+    app.router.add_get('/data/2.5/weather', current_weather)
+    return app
+
+async def start_stub_server(host='127.0.0.1', port=0, **app_kwargs):
+    # Returns (runner, base_url); port=0 picks a free port
+    app = create_stub_app(**app_kwargs)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{port}/data/2.5/weather"
+
+async def benchmark_fetch(num_cities=200, latency=0.05, failure_rate=0.1, max_connections=50):
+    # Sequential vs concurrent fetching of num_cities against the stub, with injected failures
+    runner, url = await start_stub_server(latency=latency, failure_rate=failure_rate)
+    cities = [f"City_{i}" for i in range(num_cities)]
+    rate_limits = {'openweathermap': (10000, 1)}
+    try:
+        results = {}
+        for mode in ('sequential', 'concurrent'):
+            async with AsyncWeatherFetcher('stub-key', max_connections=max_connections, backoff=0.05,
+                                           rate_limits=rate_limits, base_urls={'openweathermap': url}) as fetcher:
+                start = time.perf_counter()
+                if mode == 'sequential':
+                    records = []
+                    for city in cities:
+                        try:
+                            records.append(await fetcher.fetch(city))
+                        except WeatherFetchError as error:
+                            records.append(error)
+                else:
+                    records = await fetcher.fetch_many(cities)
+                elapsed = time.perf_counter() - start
+            failures = sum(isinstance(record, Exception) for record in records)
+            results[mode] = elapsed
+            print(f"{mode}: {num_cities} cities in {elapsed:.2f}s ({num_cities / elapsed:.0f} cities/s), "
+                  f"{fetcher.stats['retries']} retries, {failures} failed")
+        assert all(record['city'] == city for city, record in zip(cities, records) if not isinstance(record, Exception))
+        return results
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(benchmark_fetch())
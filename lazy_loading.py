@@ -0,0 +1,82 @@
+import importlib
+import os
+import subprocess
+import sys
+
+# Heavy or platform-specific dependencies are imported where they are first used. Optional
+# ones go through optional_import, so a missing package disables one feature instead of
+# stopping the dashboard or the control loop.
+
+_reported_missing = set()
+
+def optional_import(module_name, feature):
+    # The module, or None (with a one-time warning) if it or one of its imports is missing
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as error:
+        if module_name not in _reported_missing:
+            _reported_missing.add(module_name)
+            print(f"Warning: {feature} disabled ({module_name} could not be imported: {error})")
+        return None
+
+# Modules the dashboard and control loop pull in, cheapest first
+STARTUP_MODULES = [
+    'numpy', 'flask', 'pandas', 'scipy.integrate', 'gym', 'sklearn.preprocessing',
+    'matplotlib.pyplot', 'seaborn', 'plotly.express', 'tensorflow', 'tensorflow_probability',
+    'ai_control_system.inference', 'ai_control_system.facade_env', 'ai_control_system.ppo_agent',
+    'visualization.visualization', 'main_controller', 'app'
+]
+
+_IMPORT_TIMER = """
+import time
+start = time.perf_counter()
+try:
+    import {module}
+except Exception as error:
+    print('error', type(error).__name__, error)
+else:
+    print('ok', time.perf_counter() - start)
+"""
+
+_FIRST_RESPONSE_TIMER = """
+import time
+start = time.perf_counter()
+import app
+response = app.app.test_client().get('/api/current_status')
+print('ok', time.perf_counter() - start, response.status_code)
+"""
+
+def _time_in_fresh_interpreter(code, root):
+    result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return 'error', (result.stderr.strip().splitlines() or ['no output'])[-1]
+    status, detail = lines[-1].split(' ', 1)
+    return status, detail
+
+def benchmark_startup(modules=None):
+    # Cold import time of each module in its own interpreter (so shared dependencies are
+    # counted for every module that needs them), then app import to first dashboard response
+    root = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules or STARTUP_MODULES:
+        status, detail = _time_in_fresh_interpreter(_IMPORT_TIMER.format(module=module), root)
+        if status == 'ok':
+            results[module] = float(detail)
+            print(f"{module:<32} {float(detail) * 1000:9.1f} ms")
+        else:
+            results[module] = None
+            print(f"{module:<32} unavailable ({detail})")
+
+    status, detail = _time_in_fresh_interpreter(_FIRST_RESPONSE_TIMER, root)
+    if status == 'ok':
+        elapsed, status_code = detail.split()
+        results['first_response'] = float(elapsed)
+        print(f"{'app first response':<32} {float(elapsed) * 1000:9.1f} ms (HTTP {status_code})")
+    else:
+        results['first_response'] = None
+        print(f"{'app first response':<32} failed ({detail})")
+    return results
+
+if __name__ == "__main__":
+    benchmark_startup()
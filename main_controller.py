@@ -1,59 +1,165 @@
 import time
 import threading
 from data_acquisition.fetch_data import fetch_weather_data, load_config
-from ai_control_system.facade_env import FacadeEnv
-from ai_control_system.ppo_agent import PPOAgent
-from models.components.facade_controller import FacadeController
-from revit_integration.revit_integration import RevitIntegration
-from visualization.visualization import FacadeVisualizer
-import pandas as pd
+from lazy_loading import optional_import
 import numpy as np
 
+# TensorFlow, the environments, the visualizer and the Rhino/Revit integrations are imported
+# where they are first needed, so importing this module stays cheap
+
 class MainController:
-    def __init__(self):
+    def __init__(self, num_envs=1, num_workers=0, episodes_per_update=None, energy_workers=0, energy_backend=None):
+        from ai_control_system.facade_env import FacadeEnv
+        from ai_control_system.ppo_agent import PPOAgent
+        from data_acquisition.columnar_store import DEFAULT_STORE_DIR, ColumnarStore
+        
         self.config = load_config()
-        self.facade_controller = FacadeController()
-        self.revit_integration = None  # Will be initialized with a Revit document
-        self.visualizer = FacadeVisualizer()
+        
+        # Grasshopper link; only available inside Rhino
+        facade_controller = optional_import('models.components.facade_controller', 'Rhino façade control')
+        self.facade_controller = facade_controller.FacadeController() if facade_controller else None
+        self._visualizer = None
+        
+        # Controller history is appended to the columnar store; only rows not yet written go out
+        self.store = ColumnarStore(self.config.get('storage_dir', DEFAULT_STORE_DIR))
+        self.session_start = time.time()
+        self._stored_rows = {'facade': 0, 'energy': 0, 'comfort': 0}
         self.facade_data = []
         self.energy_data = []
         self.comfort_data = []
         
         # Initialize RL environment and agent
-        self.env = FacadeEnv()
+        self.env = FacadeEnv(energy_backend=energy_backend)
         self.agent = PPOAgent(state_size=self.env.observation_space.shape[0],
                               action_size=self.env.action_space.shape[0])
+        
+        # Optional lockstep environments for collecting several episodes per training update
+        self.vec_env = None
+        if num_envs > 1:
+            from ai_control_system.vec_facade_env import VecFacadeEnv
+            self.vec_env = VecFacadeEnv(num_envs, energy_backend=energy_backend)
+        
+        # Optional worker processes that collect episodes in parallel with the learner's policy
+        self.rollout_pool = None
+        if num_workers > 0:
+            from ai_control_system.rollout_workers import RolloutWorkerPool
+            self.rollout_pool = RolloutWorkerPool(num_workers)
+        self.episodes_per_update = episodes_per_update or max(num_workers, 1)
+        self.rollout_timeout = self.config.get('rollout_timeout', 600)
+        
+        # Optional background pool so energy simulations overlap with stepping the environment
+        if energy_workers > 0:
+            from revit_integration.energy_jobs import EnergyJobQueue
+            self.env.energy_jobs = EnergyJobQueue(max_workers=energy_workers)
 
     def run_simulation_cycle(self):
         state = self.env.reset()
-        total_reward = 0
-        states, actions, rewards, next_states, dones = [], [], [], [], []
+        states, actions, log_probs, rewards, next_states, dones = [], [], [], [], [], []
         
         for time_step in range(self.env.max_steps):
-            action = self.agent.get_action(state)
+            action, log_prob = self.agent.get_actions_and_log_probs(state)
+            action, log_prob = action[0], log_prob[0]
             next_state, reward, done, _ = self.env.step(action)
             
             states.append(state)
             actions.append(action)
+            log_probs.append(log_prob)
             rewards.append(reward)
             next_states.append(next_state)
             dones.append(done)
             
-            total_reward += reward
             state = next_state
             
             # Store facade, energy, and comfort data
-            self.store_facade_data(self.env.current_state, action)
-            self.store_energy_data(self.env.current_energy_use)
-            self.store_comfort_data(self.env.current_comfort_score)
+            if self.env.energy_jobs is None:
+                self.store_facade_data(self.env.current_state, action)
+                self.store_energy_data(self.env.current_energy_use)
+                self.store_comfort_data(self.env.current_comfort_score)
             
             if done:
                 break
         
+        if self.env.energy_jobs is not None:
+            # Energy simulations ran alongside the episode; settle their rewards before training
+            rewards, energy_and_comfort = self.env.resolve_rewards(rewards)
+            for next_state, action, (energy_use, comfort_score) in zip(next_states, actions, energy_and_comfort):
+                self.store_facade_data(next_state, action)
+                self.store_energy_data(energy_use)
+                self.store_comfort_data(comfort_score)
+        total_reward = sum(rewards)
+        
         # Train the PPO agent
-        loss = self.agent.train(states, actions, rewards, next_states, dones)
+        loss = self.agent.train(states, actions, rewards, next_states, dones, log_probs)
         
         print(f"Episode finished. Total reward: {total_reward}, Loss: {loss}")
+        self.report_training_stats()
+
+    def run_batched_simulation_cycle(self):
+        states = self.vec_env.reset()
+        total_rewards = np.zeros(self.vec_env.num_envs)
+        batch_states, batch_actions, batch_log_probs, batch_rewards, batch_next_states, batch_dones = [], [], [], [], [], []
+        
+        for time_step in range(self.vec_env.max_steps):
+            actions, log_probs = self.agent.get_actions_and_log_probs(states)
+            next_states, rewards, dones, _ = self.vec_env.step(actions)
+            
+            batch_states.append(states)
+            batch_actions.append(actions)
+            batch_log_probs.append(log_probs)
+            batch_rewards.append(rewards)
+            batch_next_states.append(next_states)
+            batch_dones.append(dones)
+            
+            total_rewards += rewards
+            states = next_states
+            
+            # Dashboard data follows the first environment
+            self.store_facade_data(states[0], actions[0])
+            self.store_energy_data(self.vec_env.current_energy_use[0])
+            self.store_comfort_data(self.vec_env.current_comfort_score[0])
+            
+            if dones.all():
+                break
+        
+        # Train the PPO agent on all episodes at once, time-major (steps, num_envs)
+        loss = self.agent.train(np.stack(batch_states), np.stack(batch_actions),
+                                np.stack(batch_rewards), np.stack(batch_next_states),
+                                np.stack(batch_dones), np.stack(batch_log_probs))
+        self.last_total_loss = loss
+        
+        print(f"{self.vec_env.num_envs} episodes finished. Mean total reward: {total_rewards.mean()}, Loss: {loss}")
+        self.report_training_stats()
+
+    def run_parallel_simulation_cycle(self):
+        # Push the current policy to the workers and train on the episodes they stream back
+        self.rollout_pool.set_weights(self.agent.policy_weights)
+        
+        episodes = []
+        # A worker that fails raises here; one that hangs raises TimeoutError after rollout_timeout
+        for episode in self.rollout_pool.collect(self.episodes_per_update, timeout=self.rollout_timeout):
+            if not episodes:
+                # Dashboard data follows the first episode to arrive
+                for state, action, energy_use, comfort_score in zip(episode['next_states'], episode['actions'],
+                                                                     episode['energy_use'], episode['comfort_score']):
+                    self.store_facade_data(state, action)
+                    self.store_energy_data(energy_use)
+                    self.store_comfort_data(comfort_score)
+            episodes.append(episode)
+        
+        # Episodes are concatenated along time; each one ends with done=True
+        loss = self.agent.train(*(np.concatenate([episode[key] for episode in episodes])
+                                  for key in ('states', 'actions', 'rewards', 'next_states', 'dones', 'log_probs')))
+        self.last_total_loss = loss
+        
+        total_rewards = [episode['rewards'].sum() for episode in episodes]
+        print(f"{len(episodes)} episodes collected by {self.rollout_pool.num_workers} workers. "
+              f"Mean total reward: {np.mean(total_rewards)}, Loss: {loss}")
+        self.report_training_stats()
+
+    def report_training_stats(self):
+        stats = self.agent.last_train_stats
+        print(f"PPO update: {stats['samples']} samples, {stats['gradient_steps']} gradient steps in "
+              f"{stats['wall_time']:.3f}s ({stats['samples_per_s']:.0f} samples/s)")
 
     def store_facade_data(self, state, action):
         self.facade_data.append({
@@ -83,18 +189,32 @@ class MainController:
             'comfort_score': comfort_score
         })
 
+    @property
+    def visualizer(self):
+        # Built on first use; None when matplotlib or pandas is missing
+        if self._visualizer is None:
+            visualization = optional_import('visualization.visualization', 'Visualization')
+            if visualization is not None:
+                self._visualizer = visualization.FacadeVisualizer()
+        return self._visualizer
+
+    def store_history(self):
+        for dataset, rows in (('facade', self.facade_data), ('energy', self.energy_data), ('comfort', self.comfort_data)):
+            new_rows = rows[self._stored_rows[dataset]:]
+            if new_rows:
+                self.store.append(dataset, new_rows)
+                self._stored_rows[dataset] += len(new_rows)
+
     def update_visualizations(self):
-        facade_df = pd.DataFrame(self.facade_data)
-        energy_df = pd.DataFrame(self.energy_data)
-        comfort_df = pd.DataFrame(self.comfort_data)
+        self.store_history()
         
-        facade_df.to_csv('visualization/facade_data.csv', index=False)
-        energy_df.to_csv('visualization/energy_data.csv', index=False)
-        comfort_df.to_csv('visualization/comfort_data.csv', index=False)
+        if self.visualizer is None:
+            return
         
-        self.visualizer.load_facade_data('visualization/facade_data.csv')
-        self.visualizer.load_energy_data('visualization/energy_data.csv')
-        self.visualizer.load_comfort_data('visualization/comfort_data.csv')
+        # This session's history; earlier days are pruned by partition and never opened
+        self.visualizer.load_facade_data(self.store, start_time=self.session_start)
+        self.visualizer.load_energy_data(self.store, start_time=self.session_start)
+        self.visualizer.load_comfort_data(self.store, start_time=self.session_start)
         
         self.visualizer.plot_facade_behavior()
         self.visualizer.plot_energy_performance()
@@ -105,13 +225,16 @@ class MainController:
 
     def run(self):
         while True:
-            self.run_simulation_cycle()
+            if self.rollout_pool is not None:
+                self.run_parallel_simulation_cycle()
+            elif self.vec_env is not None:
+                self.run_batched_simulation_cycle()
+            else:
+                self.run_simulation_cycle()
             self.update_visualizations()
             time.sleep(3600)  # Run every hour
 
 def main():
-    controller = MainController()
-    
     # Initialize Revit integration
     # In a real scenario, you'd need to run this within Revit
     class MockDocument:
@@ -120,9 +243,12 @@ def main():
             self.Create = None
             self.FreeformElement = None
     
-    mock_doc = MockDocument()
-    controller.revit_integration = RevitIntegration(mock_doc)
-    controller.env.revit_integration = controller.revit_integration
+    config = load_config()
+    energy_backend = None
+    if config.get('energy_backend', 'surrogate') == 'revit':
+        from revit_integration.energy_backends import create_energy_backend
+        energy_backend = create_energy_backend(config, revit_document=MockDocument())
+    controller = MainController(energy_backend=energy_backend)
     
     # Run the main control loop in a separate thread
     control_thread = threading.Thread(target=controller.run)
@@ -5,7 +5,9 @@ import websocket
 import json
 import threading
 import time
-from simulation.physics_simulation import run_physics_simulation, check_physical_constraints
+import numpy as np
+from simulation.panel_array import PanelArray
+from simulation.physics_simulation import PanelMotionCache, run_physics_simulation, check_physical_constraints
 
 class FacadeController:
     def __init__(self):
@@ -17,6 +19,7 @@ class FacadeController:
         }
         self.connect_to_server()
         self.wind_force = 0  # Initialize wind force
+        self.physics_cache = PanelMotionCache(max_entries=10000)
 
     def connect_to_server(self):
         def on_message(ws, message):
@@ -59,29 +62,33 @@ class FacadeController:
         panel_depth = 0.1 + self.adjustments["adjustment_3"] * 0.4  # Range: 0.1-0.5 meters
 
         # Create panels
-        panels = []
+        surfaces = []
+        times = []
         u_step = 1.0 / panel_count
         for i in range(panel_count):
             u = i * u_step
             panel_surface = rs.ExtrudeSurface(base_surface, rs.VectorScale(rs.SurfaceNormal(base_surface, [u, 0.5]), panel_depth))
             panel_surface = rs.RotateObject(panel_surface, rs.SurfaceDomain(base_surface, 0), rotation_angle)
-            panels.append({
-                'time': time.time(),
-                'rotation': rotation_angle,
-                'depth': panel_depth,
-                'surface': panel_surface
-            })
+            surfaces.append(panel_surface)
+            times.append(time.time())
+
+        panels = PanelArray(
+            time=times,
+            rotation=np.full(panel_count, rotation_angle),
+            depth=np.full(panel_count, panel_depth),
+            surface=surfaces
+        )
 
         # Run physics simulation
-        simulated_panels = run_physics_simulation(panels, self.wind_force)
+        simulated_panels = run_physics_simulation(panels, self.wind_force, cache=self.physics_cache)
 
         # Check physical constraints
         if check_physical_constraints(simulated_panels, max_rotation_speed=30, max_depth_change_speed=0.2):
             print("Facade adjustments are physically feasible.")
-            return [panel['surface'] for panel in simulated_panels]
+            return simulated_panels.surface
         else:
             print("Warning: Facade adjustments violate physical constraints. Using previous configuration.")
-            return [panel['surface'] for panel in panels]  # Return original panels if constraints are violated
+            return panels.surface  # Return original panels if constraints are violated
 
     def update_wind_force(self, wind_speed):
         # Simple wind force calculation (can be made more sophisticated)
@@ -0,0 +1,188 @@
+import csv
+import os
+import time
+import numpy as np
+from simulation.panel_array import PanelArray
+
+# Energy backends map a batch of FacadeEnv states, shape (batch, 9):
+#   [temp, humidity, wind_speed, wind_deg, clouds, condition, rotation, depth, panel_count]
+# to a dict of per-state arrays with the keys below.
+ENERGY_METRICS = ['annual_energy_use', 'indoor_temperature', 'indoor_humidity']
+STATE_COLUMNS = ['temperature', 'humidity', 'wind_speed', 'wind_direction', 'cloudiness',
+                 'weather_condition', 'rotation', 'depth', 'panel_count']
+
+class EnergyBackend:
+    def evaluate(self, states):
+        raise NotImplementedError
+
+class RevitEnergyBackend(EnergyBackend):
+    # Full Revit energy simulation, one state at a time. Optionally records every
+    # (state, result) pair to a CSV that calibrate_surrogate can fit against.
+    def __init__(self, revit_integration, record_path=None):
+        self.revit_integration = revit_integration
+        self.record_path = record_path
+
+    def create_facade_geometry(self, state):
+        # This is a placeholder for creating façade geometry
+        # In a real implementation, you would create actual Revit geometry here
+        return PanelArray.uniform(int(state[8]), time=0, rotation=state[6], depth=state[7], with_ids=True)
+
+    def evaluate(self, states):
+        states = np.atleast_2d(states)
+        results = {metric: np.empty(len(states)) for metric in ENERGY_METRICS}
+        for i, state in enumerate(states):
+            self.revit_integration.import_facade_model(self.create_facade_geometry(state))
+            energy_model = self.revit_integration.setup_energy_model()
+            simulation_results = self.revit_integration.run_energy_simulation(energy_model)
+            self.revit_integration.analyze_results(simulation_results)
+            results['annual_energy_use'][i] = simulation_results['annual_energy_use']
+            results['indoor_temperature'][i] = simulation_results.get('indoor_temperature', 22)  # Assume 22°C if not provided
+            results['indoor_humidity'][i] = simulation_results.get('indoor_humidity', 50)  # Assume 50% if not provided
+        if self.record_path is not None:
+            record_energy_samples(self.record_path, states, results)
+        return results
+
+# Feature names of the surrogate's design matrix
+SURROGATE_FEATURES = ['bias', 'outdoor_temperature', 'outdoor_humidity', 'wind_speed', 'cooling_degrees',
+                      'heating_degrees', 'solar_gain', 'shading', 'cooling_solar', 'heating_solar']
+
+# Hand-set analytic coefficients (features x metrics) used until the model is calibrated
+DEFAULT_SURROGATE_COEFFICIENTS = np.array([
+    # annual_energy_use, indoor_temperature, indoor_humidity
+    [50000.0, 14.3, 35.0],   # bias
+    [0.0, 0.35, 0.0],        # outdoor_temperature
+    [0.0, 0.0, 0.25],        # outdoor_humidity
+    [150.0, -0.05, 0.0],     # wind_speed: infiltration load and cooling
+    [1500.0, 0.0, 0.0],      # cooling_degrees
+    [1800.0, 0.0, 0.0],      # heating_degrees
+    [0.0, 2.0, -2.0],        # solar_gain
+    [5000.0, 0.0, 0.0],      # shading: extra artificial lighting
+    [800.0, 0.0, 0.0],       # cooling_solar: solar gain adds to cooling load
+    [-600.0, 0.0, 0.0],      # heating_solar: solar gain offsets heating load
+])
+
+def surrogate_features(states):
+    # Design matrix of shape (batch, len(SURROGATE_FEATURES)) from a batch of states
+    states = np.atleast_2d(np.asarray(states, dtype=float))
+    temperature, humidity, wind_speed = states[:, 0], states[:, 1], states[:, 2]
+    cloudiness, rotation, depth, panel_count = states[:, 4], states[:, 6], states[:, 7], states[:, 8]
+
+    # Fraction of the façade covered by panels, and how much of the sun they block at this angle
+    coverage = np.clip((panel_count / 20) * (depth / 0.5), 0, 1)
+    shading = coverage * (0.5 + 0.5 * np.sin(np.radians(rotation)))
+    solar_gain = (1 - np.clip(cloudiness, 0, 100) / 100) * (1 - shading)
+
+    cooling_degrees = np.maximum(temperature - 22, 0)
+    heating_degrees = np.maximum(18 - temperature, 0)
+
+    return np.stack([
+        np.ones(len(states)),
+        temperature,
+        humidity,
+        wind_speed,
+        cooling_degrees,
+        heating_degrees,
+        solar_gain,
+        shading,
+        cooling_degrees * solar_gain,
+        heating_degrees * solar_gain
+    ], axis=1)
+
+class SurrogateEnergyModel(EnergyBackend):
+    # Linear-in-features surrogate for the Revit annual simulation. Evaluating a batch is a
+    # single matrix product, so it runs in the RL reward loop on any platform.
+    def __init__(self, coefficients=None):
+        self.coefficients = DEFAULT_SURROGATE_COEFFICIENTS.copy() if coefficients is None else np.asarray(coefficients, dtype=float)
+
+    def evaluate(self, states):
+        predictions = surrogate_features(states) @ self.coefficients
+        return {metric: predictions[:, i] for i, metric in enumerate(ENERGY_METRICS)}
+
+    def save(self, path):
+        np.savez(path, coefficients=self.coefficients, features=SURROGATE_FEATURES, metrics=ENERGY_METRICS)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if list(data['features']) != SURROGATE_FEATURES:
+                raise ValueError(f"Surrogate model at {path} was fitted with different features")
+            return cls(data['coefficients'])
+
+class MockRevitBackend(EnergyBackend):
+    # Stand-in for Revit where it is unavailable: surrogate values returned after a fixed
+    # per-state latency, for exercising the asynchronous reward pipeline
+    def __init__(self, latency=0.5, model=None):
+        self.latency = latency
+        self.model = model or SurrogateEnergyModel()
+
+    def evaluate(self, states):
+        states = np.atleast_2d(states)
+        time.sleep(self.latency * len(states))
+        return self.model.evaluate(states)
+
+def record_energy_samples(path, states, results):
+    # Appends (state, metrics) rows to a CSV for later calibration
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    write_header = not os.path.exists(path)
+    with open(path, 'a', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        if write_header:
+            writer.writerow(STATE_COLUMNS + ENERGY_METRICS)
+        for i, state in enumerate(states):
+            writer.writerow(list(state) + [results[metric][i] for metric in ENERGY_METRICS])
+
+def load_energy_samples(path):
+    data = np.genfromtxt(path, delimiter=',', names=True)
+    states = np.stack([data[column] for column in STATE_COLUMNS], axis=1)
+    targets = np.stack([data[metric] for metric in ENERGY_METRICS], axis=1)
+    return np.atleast_2d(states), np.atleast_2d(targets)
+
+def calibrate_surrogate(states, targets, ridge=1e-6):
+    # Ridge least-squares fit of the surrogate coefficients to stored Revit results.
+    # Returns the fitted model and its per-metric RMSE on the calibration data.
+    features = surrogate_features(states)
+    targets = np.atleast_2d(np.asarray(targets, dtype=float))
+    gram = features.T @ features + ridge * np.eye(features.shape[1])
+    coefficients = np.linalg.solve(gram, features.T @ targets)
+    residuals = features @ coefficients - targets
+    rmse = dict(zip(ENERGY_METRICS, np.sqrt(np.mean(residuals ** 2, axis=0))))
+    return SurrogateEnergyModel(coefficients), rmse
+
+def create_energy_backend(config, revit_document=None):
+    # 'energy_backend: surrogate' (default) uses the surrogate, loaded from
+    # 'surrogate_model_path' when that file exists. 'mock_revit' adds simulated Revit latency.
+    # 'revit' runs full simulations in the given Revit document, recorded for calibration and
+    # cached on disk in 'energy_cache_dir'; it can only be built inside Revit.
+    backend = config.get('energy_backend', 'surrogate')
+    if backend == 'revit':
+        if revit_document is None:
+            raise ValueError("energy_backend 'revit' needs a Revit document: build the backend inside Revit with "
+                             "create_energy_backend(config, revit_document=doc) and pass it to the environment "
+                             "as energy_backend=, or choose the 'surrogate' or 'mock_revit' backend")
+        from revit_integration.revit_integration import RevitIntegration
+        from revit_integration.energy_cache import CachedEnergyBackend, EnergyResultCache
+        revit_backend = RevitEnergyBackend(RevitIntegration(revit_document),
+                                           record_path='revit_integration/results/energy_samples.csv')
+        # Reuse simulations of previously seen geometry and weather across runs and processes
+        energy_cache = EnergyResultCache(config.get('energy_cache_dir', 'revit_integration/results/energy_cache'))
+        return CachedEnergyBackend(revit_backend, energy_cache)
+    if backend == 'mock_revit':
+        return MockRevitBackend(latency=config.get('mock_revit_latency', 0.5))
+    model_path = config.get('surrogate_model_path', 'revit_integration/results/energy_surrogate.npz')
+    if os.path.exists(model_path):
+        return SurrogateEnergyModel.load(model_path)
+    return SurrogateEnergyModel()
+
+if __name__ == "__main__":
+    # Calibrate the surrogate against recorded Revit simulations
+    samples_path = "revit_integration/results/energy_samples.csv"
+    model_path = "revit_integration/results/energy_surrogate.npz"
+
+    states, targets = load_energy_samples(samples_path)
+    model, rmse = calibrate_surrogate(states, targets)
+    model.save(model_path)
+
+    print(f"Calibrated surrogate on {len(states)} Revit results")
+    for metric, error in rmse.items():
+        print(f"{metric} RMSE: {error:.3f}")
+    print(f"Surrogate saved to: {model_path}")
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+from revit_integration.energy_backends import ENERGY_METRICS, EnergyBackend
+
+class EnergyResultCache:
+    # Persistent, content-addressed store of energy simulation metrics. Entries are JSON files
+    # named by the SHA-256 of their key and sharded into subdirectories by hash prefix.
+    # Writes go to a temporary file that is atomically renamed into place, so concurrent
+    # processes sharing the directory never see partial entries. Reads refresh the file's
+    # mtime, and when the directory grows past max_bytes the least recently used entries
+    # are removed.
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approximate_bytes = None
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_digest(self, key):
+        encoded = json.dumps(key, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], digest + '.json')
+
+    def get(self, key):
+        path = self._path(self.key_digest(key))
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # Missing, or removed/replaced by another process mid-read
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+        with self._lock:
+            self.stats['hits'] += 1
+        return entry['metrics']
+
+    def put(self, key, metrics):
+        path = self._path(self.key_digest(key))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps({'key': key, 'metrics': metrics}, sort_keys=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._lock:
+            self.stats['writes'] += 1
+            if self._approximate_bytes is None:
+                self._approximate_bytes = self._scan()[1]
+            else:
+                self._approximate_bytes += len(payload)
+            over_budget = self._approximate_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def _scan(self):
+        entries = []
+        total = 0
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        return entries, total
+
+    def evict(self):
+        # Removes least recently used entries until the cache is at 90% of max_bytes
+        entries, total = self._scan()
+        target = 0.9 * self.max_bytes
+        evicted = 0
+        for mtime, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Already evicted by another process
+            total -= size
+            evicted += 1
+        with self._lock:
+            self.stats['evictions'] += evicted
+            self._approximate_bytes = total
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+class CachedEnergyBackend(EnergyBackend):
+    # Wraps an energy backend with an EnergyResultCache. States are quantized: façade geometry
+    # (rotation, depth, panel count) to its resolution and the weather to coarse buckets.
+    # Misses are simulated at the bucket's representative state, so the stored result does
+    # not depend on which state filled it.
+    def __init__(self, backend, cache, namespace='revit', rotation_step=1.0, depth_step=0.01,
+                 weather_steps=(1.0, 5.0, 1.0, 45.0, 10.0)):
+        self.backend = backend
+        self.cache = cache
+        self.namespace = namespace
+        # Quantization steps for the state columns [temp, humidity, wind_speed, wind_deg, clouds,
+        # condition, rotation, depth, panel_count]; condition and panel count are already discrete
+        self.steps = np.array(list(weather_steps) + [1.0, rotation_step, depth_step, 1.0])
+
+    def quantize(self, states):
+        buckets = np.round(np.atleast_2d(np.asarray(states, dtype=float)) / self.steps).astype(np.int64)
+        return buckets, buckets * self.steps
+
+    def evaluate(self, states):
+        buckets, representative_states = self.quantize(states)
+        keys = [{'namespace': self.namespace, 'bucket': bucket} for bucket in buckets.tolist()]
+        results = [self.cache.get(key) for key in keys]
+
+        # Simulate each missing bucket once, even if it appears several times in the batch
+        missing = {}
+        for i, result in enumerate(results):
+            if result is None:
+                missing.setdefault(tuple(keys[i]['bucket']), []).append(i)
+        if missing:
+            first_indices = [indices[0] for indices in missing.values()]
+            computed = self.backend.evaluate(representative_states[first_indices])
+            for j, indices in enumerate(missing.values()):
+                metrics = {metric: float(values[j]) for metric, values in computed.items()}
+                self.cache.put(keys[indices[0]], metrics)
+                for i in indices:
+                    results[i] = metrics
+
+        return {metric: np.array([result[metric] for result in results], dtype=float) for metric in ENERGY_METRICS}
@@ -0,0 +1,51 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+def _evaluate(backend, states):
+    return backend.evaluate(states)
+
+class EnergyJobQueue:
+    # Runs energy backend evaluations on a local worker pool so environment stepping and
+    # policy inference continue while simulations are in flight. submit() returns a
+    # concurrent.futures.Future of the backend's result dict.
+    #
+    # Backpressure: at most max_pending jobs may be queued or running; submit() blocks until
+    # a slot frees up (or raises TimeoutError after timeout seconds).
+    # Threads suit backends that release the GIL or wait on I/O (NumPy surrogate, a mock or
+    # remote Revit); use_processes=True needs a picklable backend.
+    def __init__(self, max_workers=4, max_pending=None, use_processes=False):
+        self.max_workers = max_workers
+        self.max_pending = max_pending or 4 * max_workers
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self.executor = executor_class(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'blocked': 0}
+
+    def submit(self, backend, states, timeout=None):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats['blocked'] += 1
+            if not self._slots.acquire(timeout=timeout):
+                raise TimeoutError(f"Energy job queue is full ({self.max_pending} pending jobs)")
+
+        try:
+            future = self.executor.submit(_evaluate, backend, states)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.stats['submitted'] += 1
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, future):
+        self._slots.release()
+        with self._lock:
+            if future.cancelled() or future.exception() is not None:
+                self.stats['failed'] += 1
+            else:
+                self.stats['completed'] += 1
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
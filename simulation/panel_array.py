@@ -0,0 +1,82 @@
+import numpy as np
+
+class PanelArray:
+    # Struct-of-arrays panel set: one NumPy column per field instead of one dict per panel.
+    # Indexing and iteration yield the legacy dict form so dict-based callers keep working.
+    __slots__ = ('time', 'rotation', 'depth', 'velocity', 'panel_id', 'surface')
+
+    REQUIRED_FIELDS = ('time', 'rotation', 'depth')
+    OPTIONAL_FIELDS = ('velocity', 'panel_id', 'surface')
+
+    def __init__(self, time, rotation, depth, velocity=None, panel_id=None, surface=None):
+        self.time = np.asarray(time, dtype=float)
+        self.rotation = np.asarray(rotation, dtype=float)
+        self.depth = np.asarray(depth, dtype=float)
+        self.velocity = None if velocity is None else np.asarray(velocity, dtype=float)
+        self.panel_id = None if panel_id is None else np.asarray(panel_id, dtype=np.int64)
+        # Surfaces are opaque geometry handles (e.g. Rhino object ids), kept as a plain list
+        self.surface = None if surface is None else list(surface)
+
+        n = len(self.depth)
+        for name in self.__slots__:
+            column = getattr(self, name)
+            if column is not None and len(column) != n:
+                raise ValueError(f"PanelArray column '{name}' has length {len(column)}, expected {n}")
+
+    @classmethod
+    def uniform(cls, count, time, rotation, depth, with_ids=False):
+        # Identical panels, e.g. the output of FacadeEnv._apply_action
+        return cls(
+            time=np.full(count, time, dtype=float),
+            rotation=np.full(count, rotation, dtype=float),
+            depth=np.full(count, depth, dtype=float),
+            panel_id=np.arange(count) if with_ids else None
+        )
+
+    @classmethod
+    def from_dicts(cls, panels):
+        panels = list(panels)
+        columns = {name: [panel[name] for panel in panels] for name in cls.REQUIRED_FIELDS}
+        for name in cls.OPTIONAL_FIELDS:
+            if panels and all(name in panel for panel in panels):
+                columns[name] = [panel[name] for panel in panels]
+        return cls(**columns)
+
+    def to_dicts(self):
+        return [self[i] for i in range(len(self))]
+
+    def replace(self, **columns):
+        # New PanelArray sharing every column that isn't replaced
+        current = {name: getattr(self, name) for name in self.__slots__}
+        current.update(columns)
+        return PanelArray(**current)
+
+    def __len__(self):
+        return len(self.depth)
+
+    def __getitem__(self, index):
+        panel = {
+            'time': self.time[index].item(),
+            'rotation': self.rotation[index].item(),
+            'depth': self.depth[index].item()
+        }
+        if self.velocity is not None:
+            panel['velocity'] = self.velocity[index].item()
+        if self.panel_id is not None:
+            panel['panel_id'] = self.panel_id[index].item()
+        if self.surface is not None:
+            panel['surface'] = self.surface[index]
+        return panel
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"PanelArray(panels={len(self)})"
+
+def as_panel_array(panels):
+    # Conversion shim: accepts a PanelArray or the legacy list of panel dicts
+    if isinstance(panels, PanelArray):
+        return panels
+    return PanelArray.from_dicts(panels)
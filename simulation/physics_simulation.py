@@ -1,5 +1,56 @@
+import time
+import threading
+from collections import OrderedDict
 import numpy as np
 from scipy.integrate import odeint
+from simulation.panel_array import PanelArray, as_panel_array
+
+# Tolerance on the damping ratio inside which a system is treated as critically damped
+CRITICAL_DAMPING_TOLERANCE = 1e-9
+
+def damped_spring_state(initial_position, initial_velocity, force, t, mass, spring_constant, damping_coefficient):
+    # Closed-form solution of m*x'' + c*x' + k*x = F with x(0) = x0, x'(0) = v0.
+    # All arguments broadcast against each other, so t can be a (samples, 1) column
+    # evaluated against (panels,) rows, and mass/k/c may differ per panel.
+    x0, v0, force, t, m, k, c = np.broadcast_arrays(*[np.asarray(a, dtype=float) for a in (
+        initial_position, initial_velocity, force, t, mass, spring_constant, damping_coefficient)])
+
+    omega = np.sqrt(k / m)  # Natural frequency
+    zeta = c / (2 * np.sqrt(k * m))  # Damping ratio
+    y0 = x0 - force / k  # Displacement from the static equilibrium under the constant force
+
+    under = zeta < 1 - CRITICAL_DAMPING_TOLERANCE
+    over = zeta > 1 + CRITICAL_DAMPING_TOLERANCE
+
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        decay = np.exp(-zeta * omega * t)
+
+        # Under-damped: y = e^(-zeta*w*t) * (A*cos(wd*t) + B*sin(wd*t))
+        wd = omega * np.sqrt(1 - zeta ** 2)
+        a = y0
+        b = (v0 + zeta * omega * y0) / wd
+        cos_t, sin_t = np.cos(wd * t), np.sin(wd * t)
+        y_under = decay * (a * cos_t + b * sin_t)
+        v_under = decay * ((b * wd - zeta * omega * a) * cos_t - (a * wd + zeta * omega * b) * sin_t)
+
+        # Critically damped: y = (A + B*t) * e^(-w*t)
+        b_crit = v0 + omega * y0
+        y_crit = (y0 + b_crit * t) * decay
+        v_crit = (b_crit - omega * (y0 + b_crit * t)) * decay
+
+        # Over-damped: y = C1*e^(r1*t) + C2*e^(r2*t)
+        root = omega * np.sqrt(zeta ** 2 - 1)
+        r1 = -zeta * omega + root
+        r2 = -zeta * omega - root
+        c1 = (v0 - r2 * y0) / (r1 - r2)
+        c2 = y0 - c1
+        e1, e2 = np.exp(r1 * t), np.exp(r2 * t)
+        y_over = c1 * e1 + c2 * e2
+        v_over = c1 * r1 * e1 + c2 * r2 * e2
+
+    y = np.where(under, y_under, np.where(over, y_over, y_crit))
+    v = np.where(under, v_under, np.where(over, v_over, v_crit))
+    return y + force / k, v
 
 class PhysicsSimulator:
     def __init__(self, mass, spring_constant, damping_coefficient):
@@ -19,46 +70,379 @@ class PhysicsSimulator:
         solution = odeint(self.equation_of_motion, initial_state, t, args=(force,))
         return t, solution
 
-def check_physical_constraints(panels, max_rotation_speed, max_depth_change_speed):
-    constraints_violated = False
-    for i in range(1, len(panels)):
-        rotation_change = abs(panels[i]['rotation'] - panels[i-1]['rotation'])
-        depth_change = abs(panels[i]['depth'] - panels[i-1]['depth'])
-        time_step = panels[i]['time'] - panels[i-1]['time']
+    def simulate_panels_analytic(self, initial_positions, initial_velocities, force, time_span):
+        # Final position and velocity of every panel after time_span, evaluated in one pass
+        positions, velocities = damped_spring_state(
+            initial_positions, initial_velocities, force, time_span, self.mass, self.k, self.c)
+        return np.atleast_1d(positions), np.atleast_1d(velocities)
 
-        if rotation_change / time_step > max_rotation_speed:
-            print(f"Warning: Rotation speed limit exceeded between panels {i-1} and {i}")
-            constraints_violated = True
+    def simulate_panel_trajectories(self, initial_positions, initial_velocities, force, time_span, num_samples=1000):
+        # Sampled trajectories for every panel; positions and velocities have shape (num_samples, panels)
+        t = np.linspace(0, time_span, num=num_samples)
+        positions, velocities = damped_spring_state(
+            np.atleast_1d(initial_positions), np.atleast_1d(initial_velocities), force,
+            t[:, np.newaxis], self.mass, self.k, self.c)
+        return t, positions, velocities
 
-        if depth_change / time_step > max_depth_change_speed:
-            print(f"Warning: Depth change speed limit exceeded between panels {i-1} and {i}")
-            constraints_violated = True
+    def advance_panels(self, positions, velocities, rest_positions, force, duration, substeps=1, initial_force=None):
+        # Advances panels that are already in motion towards their commanded rest positions.
+        # The external force ramps linearly from initial_force to force across the substeps
+        # and is held constant within each substep, where the closed-form solution is exact.
+        positions = np.asarray(positions, dtype=float)
+        velocities = np.asarray(velocities, dtype=float)
+        rest_positions = np.asarray(rest_positions, dtype=float)
+        if initial_force is None:
+            initial_force = force
 
-    return not constraints_violated
+        h = duration / substeps
+        for i in range(substeps):
+            substep_force = initial_force + (force - initial_force) * (i + 0.5) / substeps
+            positions, velocities = damped_spring_state(
+                positions, velocities, substep_force + self.k * rest_positions, h, self.mass, self.k, self.c)
+        return positions, velocities
 
-def run_physics_simulation(panels, wind_force):
-    simulator = PhysicsSimulator(mass=10, spring_constant=100, damping_coefficient=5)
-    simulated_panels = []
-
-    for panel in panels:
-        t, solution = simulator.simulate_panel_motion(
-            initial_position=panel['depth'],
-            initial_velocity=0,
-            force=wind_force,
-            time_span=10  # Simulate for 10 seconds
+# Dormand-Prince 5(4) coefficients for the adaptive integrator
+_DP_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1, 1])
+_DP_A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+    [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84],
+]
+_DP_B5 = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0])
+_DP_B4 = np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40])
+
+class IntegrationError(RuntimeError):
+    pass
+
+class BatchedPanelIntegrator:
+    def __init__(self, masses, spring_constants, damping_coefficients, nonlinear_force=None):
+        # Per-panel parameters; scalars are broadcast over the whole panel set
+        self.masses = np.asarray(masses, dtype=float)
+        self.k = np.asarray(spring_constants, dtype=float)
+        self.c = np.asarray(damping_coefficients, dtype=float)
+        # Optional callable f(x, v, t) -> per-panel force added to the linear model
+        self.nonlinear_force = nonlinear_force
+
+    def derivatives(self, state, t, force):
+        # state is a (2, panels) matrix: row 0 positions, row 1 velocities
+        x, v = state
+        total_force = force - self.k * x - self.c * v
+        if self.nonlinear_force is not None:
+            total_force = total_force + self.nonlinear_force(x, v, t)
+        return np.stack([v, total_force / self.masses])
+
+    def integrate(self, initial_positions, initial_velocities, force, time_span, method='rk4', dt=0.01, rtol=1e-6, atol=1e-9, max_steps=100000):
+        x0, v0 = np.broadcast_arrays(np.atleast_1d(np.asarray(initial_positions, dtype=float)),
+                                     np.asarray(initial_velocities, dtype=float))
+        state = np.stack([x0, v0])
+        force = np.asarray(force, dtype=float)
+
+        if method == 'rk4':
+            state = self._integrate_rk4(state, force, time_span, dt)
+        elif method == 'rk45':
+            state = self._integrate_rk45(state, force, time_span, dt, rtol, atol, max_steps)
+        else:
+            raise ValueError(f"Unknown integration method: {method}")
+
+        return state[0], state[1]
+
+    def _integrate_rk4(self, state, force, time_span, dt):
+        n_steps = max(1, int(np.ceil(time_span / dt)))
+        h = time_span / n_steps
+        t = 0.0
+        for _ in range(n_steps):
+            k1 = self.derivatives(state, t, force)
+            k2 = self.derivatives(state + 0.5 * h * k1, t + 0.5 * h, force)
+            k3 = self.derivatives(state + 0.5 * h * k2, t + 0.5 * h, force)
+            k4 = self.derivatives(state + h * k3, t + h, force)
+            state = state + (h / 6) * (k1 + 2 * k2 + 2 * k3 + k4)
+            t += h
+        return state
+
+    def _integrate_rk45(self, state, force, time_span, dt, rtol, atol, max_steps):
+        # One shared step size for the batch, controlled by the worst panel's error. Raises
+        # IntegrationError if the solution blows up (non-finite error), the step size collapses
+        # below floating-point resolution, or max_steps attempts do not reach time_span.
+        t = 0.0
+        h = min(dt, time_span)
+        k = [None] * 7
+        k[0] = self.derivatives(state, t, force)
+        steps = 0
+        while t < time_span:
+            steps += 1
+            if steps > max_steps:
+                raise IntegrationError(f"rk45 did not reach t={time_span} within {max_steps} steps (stopped at t={t:.6g})")
+            h = min(h, time_span - t)
+            for i in range(1, 7):
+                stage = state + h * sum(a * k[j] for j, a in enumerate(_DP_A[i]) if a != 0)
+                k[i] = self.derivatives(stage, t + _DP_C[i] * h, force)
+            new_state = state + h * sum(b * k[i] for i, b in enumerate(_DP_B5) if b != 0)
+            error = h * sum((b5 - b4) * k[i] for i, (b5, b4) in enumerate(zip(_DP_B5, _DP_B4)) if b5 != b4)
+
+            scale = atol + rtol * np.maximum(np.abs(state), np.abs(new_state))
+            error_norm = np.max(np.sqrt(np.mean((error / scale) ** 2, axis=0))) if state.size else 0.0
+            if not np.isfinite(error_norm):
+                raise IntegrationError(f"rk45 solution became non-finite at t={t:.6g}")
+
+            if error_norm <= 1:
+                t += h
+                state = new_state
+                k[0] = k[6]  # First-same-as-last
+            factor = 5.0 if error_norm == 0 else min(5.0, max(0.2, 0.9 * error_norm ** -0.2))
+            h *= factor
+            if t < time_span and h < 4 * np.spacing(max(t, time_span)):
+                raise IntegrationError(f"rk45 step size underflow at t={t:.6g} (h={h:.3g})")
+        return state
+
+def benchmark_batched_integrator(panel_counts=(10, 1000, 100000), time_span=10, reference_panels=200, seed=0):
+    # Compares the batched integrators against per-panel odeint on heterogeneous panels.
+    # odeint is timed on at most reference_panels panels and its cost extrapolated linearly.
+    rng = np.random.default_rng(seed)
+    results = []
+    for n in panel_counts:
+        masses = rng.uniform(5, 20, n)
+        spring_constants = rng.uniform(50, 200, n)
+        damping_coefficients = rng.uniform(1, 60, n)
+        depths = rng.uniform(0.1, 0.5, n)
+        force = 50.0
+        integrator = BatchedPanelIntegrator(masses, spring_constants, damping_coefficients)
+
+        m = min(n, reference_panels)
+        start = time.perf_counter()
+        reference = np.empty((2, m))
+        for i in range(m):
+            simulator = PhysicsSimulator(masses[i], spring_constants[i], damping_coefficients[i])
+            _, solution = simulator.simulate_panel_motion(depths[i], 0, force, time_span)
+            reference[:, i] = solution[-1]
+        odeint_time = (time.perf_counter() - start) * n / m
+
+        row = {'panels': n, 'odeint_s': odeint_time}
+        for method in ('rk4', 'rk45'):
+            start = time.perf_counter()
+            positions, velocities = integrator.integrate(depths, 0, force, time_span, method=method)
+            elapsed = time.perf_counter() - start
+            row[f'{method}_s'] = elapsed
+            row[f'{method}_speedup'] = odeint_time / elapsed
+            row[f'{method}_max_error'] = max(np.max(np.abs(positions[:m] - reference[0])),
+                                             np.max(np.abs(velocities[:m] - reference[1])))
+        results.append(row)
+        print(f"{n:>7} panels: odeint {odeint_time:.3f}s | "
+              f"rk4 {row['rk4_s']:.3f}s (x{row['rk4_speedup']:.1f}, err {row['rk4_max_error']:.1e}) | "
+              f"rk45 {row['rk45_s']:.3f}s (x{row['rk45_speedup']:.1f}, err {row['rk45_max_error']:.1e})")
+    return results
+
+class ConstraintWarningLimiter:
+    # Aggregates constraint violation warnings and prints at most one summary per interval
+    def __init__(self, min_interval=10.0):
+        self.min_interval = min_interval
+        self._last_report = None
+        self._suppressed_checks = 0
+        self._suppressed_violations = 0
+
+    def report(self, rotation_violations, depth_violations, max_rotation_rate, max_depth_rate):
+        now = time.monotonic()
+        if self._last_report is not None and now - self._last_report < self.min_interval:
+            self._suppressed_checks += 1
+            self._suppressed_violations += rotation_violations + depth_violations
+            return
+        message = (f"Warning: {rotation_violations} rotation and {depth_violations} depth change speed violations "
+                   f"(max rates {max_rotation_rate:.2f} deg/s, {max_depth_rate:.3f} m/s)")
+        if self._suppressed_checks:
+            message += (f"; {self._suppressed_violations} violations in {self._suppressed_checks} "
+                        f"earlier checks suppressed")
+        print(message)
+        self._last_report = now
+        self._suppressed_checks = 0
+        self._suppressed_violations = 0
+
+constraint_warning_limiter = ConstraintWarningLimiter()
+
+def _rates_of_change(changes, time_steps):
+    # A change over a zero time step is an infinite rate; no change is a zero rate
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = changes / time_steps
+    return np.where(time_steps > 0, rates, np.where(changes > 0, np.inf, 0.0))
+
+def _constraint_result(rotation_rates, depth_rates, max_rotation_speed, max_depth_change_speed):
+    rotation_violations = rotation_rates > max_rotation_speed
+    depth_violations = depth_rates > max_depth_change_speed
+
+    return {
+        'passed': not (rotation_violations.any() or depth_violations.any()),
+        'rotation_violations': rotation_violations,
+        'depth_violations': depth_violations,
+        'max_rotation_rate': float(rotation_rates.max()) if rotation_rates.size else 0.0,
+        'max_depth_rate': float(depth_rates.max()) if depth_rates.size else 0.0,
+    }
+
+def _report_constraint_result(result, limiter):
+    if not result['passed'] and limiter is not None:
+        limiter.report(int(result['rotation_violations'].sum()), int(result['depth_violations'].sum()),
+                       result['max_rotation_rate'], result['max_depth_rate'])
+
+def evaluate_physical_constraints(times, rotations, depths, max_rotation_speed, max_depth_change_speed):
+    # Array-based constraint check. Masks have one entry per consecutive panel pair (i-1, i).
+    time_steps = np.abs(np.diff(np.asarray(times, dtype=float)))
+    rotation_rates = _rates_of_change(np.abs(np.diff(np.asarray(rotations, dtype=float))), time_steps)
+    depth_rates = _rates_of_change(np.abs(np.diff(np.asarray(depths, dtype=float))), time_steps)
+    return _constraint_result(rotation_rates, depth_rates, max_rotation_speed, max_depth_change_speed)
+
+def evaluate_panel_transitions(previous_panels, panels, max_rotation_speed, max_depth_change_speed):
+    # Per-panel rates of change between two snapshots of the same panel set over time.
+    # Masks have one entry per panel.
+    previous_panels = as_panel_array(previous_panels)
+    panels = as_panel_array(panels)
+    time_steps = np.abs(panels.time - previous_panels.time)
+    rotation_rates = _rates_of_change(np.abs(panels.rotation - previous_panels.rotation), time_steps)
+    depth_rates = _rates_of_change(np.abs(panels.depth - previous_panels.depth), time_steps)
+    return _constraint_result(rotation_rates, depth_rates, max_rotation_speed, max_depth_change_speed)
+
+def check_panel_transitions_batch(previous_rotations, rotations, previous_depths, depths, time_steps, mask,
+                                  max_rotation_speed, max_depth_change_speed, limiter=constraint_warning_limiter):
+    # check_panel_transitions for a batch of environments: (num_envs, max_panels) arrays with
+    # `mask` marking the slots in use. Returns one pass flag per environment.
+    time_steps = np.broadcast_to(np.abs(np.asarray(time_steps, dtype=float)), np.shape(mask))
+    rotation_rates = np.where(mask, _rates_of_change(np.abs(rotations - previous_rotations), time_steps), 0.0)
+    depth_rates = np.where(mask, _rates_of_change(np.abs(depths - previous_depths), time_steps), 0.0)
+    result = _constraint_result(rotation_rates, depth_rates, max_rotation_speed, max_depth_change_speed)
+    _report_constraint_result(result, limiter)
+    return ~(result['rotation_violations'].any(axis=1) | result['depth_violations'].any(axis=1))
+
+def check_physical_constraints(panels, max_rotation_speed, max_depth_change_speed, limiter=constraint_warning_limiter):
+    panels = as_panel_array(panels)
+    result = evaluate_physical_constraints(
+        panels.time,
+        panels.rotation,
+        panels.depth,
+        max_rotation_speed,
+        max_depth_change_speed
+    )
+    _report_constraint_result(result, limiter)
+    return result['passed']
+
+def check_panel_transitions(previous_panels, panels, max_rotation_speed, max_depth_change_speed, limiter=constraint_warning_limiter):
+    result = evaluate_panel_transitions(previous_panels, panels, max_rotation_speed, max_depth_change_speed)
+    _report_constraint_result(result, limiter)
+    return result['passed']
+
+class PanelMotionCache:
+    # Bounded LRU memo of final panel states for panels starting at rest, keyed by the
+    # quantized (depth, force, time span) triple and the simulator parameters.
+    # Misses are solved at the quantized values so cached results don't depend on
+    # which caller filled them.
+    def __init__(self, max_entries=100000, depth_resolution=1e-4, force_resolution=1e-2, time_resolution=1e-3):
+        self.max_entries = max_entries
+        self.depth_resolution = depth_resolution
+        self.force_resolution = force_resolution
+        self.time_resolution = time_resolution
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self.evictions = 0
+
+    def get_final_states(self, simulator, depths, force, time_span, method='analytic'):
+        depth_keys = np.round(np.asarray(depths, dtype=float) / self.depth_resolution).astype(np.int64)
+        force_key = int(round(force / self.force_resolution))
+        time_key = int(round(time_span / self.time_resolution))
+        prefix = (simulator.mass, simulator.k, simulator.c, force_key, time_key, method)
+
+        # Deduplicate within the call; identical panels are solved and looked up once
+        unique_keys, inverse = np.unique(depth_keys, return_inverse=True)
+        unique_positions = np.empty(len(unique_keys))
+        unique_velocities = np.empty(len(unique_keys))
+
+        missing = []
+        with self._lock:
+            self.deduplicated += len(depth_keys) - len(unique_keys)
+            for i, depth_key in enumerate(unique_keys.tolist()):
+                entry = self._entries.get(prefix + (depth_key,))
+                if entry is None:
+                    missing.append(i)
+                    continue
+                self._entries.move_to_end(prefix + (depth_key,))
+                unique_positions[i], unique_velocities[i] = entry
+            self.hits += len(unique_keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            missing = np.array(missing)
+            positions, velocities = solve_final_states(
+                simulator, unique_keys[missing] * self.depth_resolution,
+                force_key * self.force_resolution, time_key * self.time_resolution, method)
+            unique_positions[missing] = positions
+            unique_velocities[missing] = velocities
+
+            with self._lock:
+                for i, position, velocity in zip(missing.tolist(), positions.tolist(), velocities.tolist()):
+                    self._entries[prefix + (int(unique_keys[i]),)] = (position, velocity)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return unique_positions[inverse], unique_velocities[inverse]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'deduplicated': self.deduplicated,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.deduplicated = self.evictions = 0
+
+def solve_final_states(simulator, depths, force, time_span, method='analytic'):
+    # Final (positions, velocities) arrays for panels released from rest at the given depths
+    depths = np.asarray(depths, dtype=float)
+    if method == 'odeint':
+        # Reference path: integrate every panel separately
+        final_states = np.empty((len(depths), 2))
+        for i, depth in enumerate(depths):
+            t, solution = simulator.simulate_panel_motion(
+                initial_position=depth,
+                initial_velocity=0,
+                force=force,
+                time_span=time_span
+            )
+            final_states[i] = solution[-1]
+        return final_states[:, 0], final_states[:, 1]
+    elif method in ('rk4', 'rk45'):
+        integrator = BatchedPanelIntegrator(simulator.mass, simulator.k, simulator.c)
+        return integrator.integrate(depths, 0, force, time_span, method=method)
+    elif method == 'analytic':
+        return simulator.simulate_panels_analytic(
+            initial_positions=depths,
+            initial_velocities=0,
+            force=force,
+            time_span=time_span
         )
-        
-        final_position = solution[-1][0]
-        final_velocity = solution[-1][1]
-        
-        simulated_panels.append({
-            'time': panel['time'],
-            'rotation': panel['rotation'],
-            'depth': final_position,
-            'velocity': final_velocity
-        })
-
-    return simulated_panels
+    raise ValueError(f"Unknown physics simulation method: {method}")
+
+def run_physics_simulation(panels, wind_force, time_span=10, method='analytic', cache=None):
+    # Accepts a PanelArray or a list of panel dicts and returns the same form
+    panel_array = as_panel_array(panels)
+    simulator = PhysicsSimulator(mass=10, spring_constant=100, damping_coefficient=5)
+
+    if cache is not None:
+        final_positions, final_velocities = cache.get_final_states(simulator, panel_array.depth, wind_force, time_span, method)
+    else:
+        final_positions, final_velocities = solve_final_states(simulator, panel_array.depth, wind_force, time_span, method)
+
+    simulated_panels = panel_array.replace(depth=final_positions, velocity=final_velocities)
+    return simulated_panels if isinstance(panels, PanelArray) else simulated_panels.to_dicts()
 
 if __name__ == "__main__":
     # Example usage
@@ -80,3 +464,6 @@ if __name__ == "__main__":
 
     for panel in simulated_panels:
         print(f"Time: {panel['time']}, Rotation: {panel['rotation']}, Depth: {panel['depth']:.2f}, Velocity: {panel['velocity']:.2f}")
+
+    print("\nBatched integrator throughput:")
+    benchmark_batched_integrator()
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+import pytest
+from data_acquisition import fetch_data
+from data_acquisition.fetch_data import AsyncWeatherFetcher, RateLimiter, WeatherFetchError
+from data_acquisition.weather_stub_server import STATS, start_stub_server
+
+# The stub server runs on its own event loop thread, so the client side can be driven with
+# asyncio.run or synchronously.
+
+UNLIMITED = {'openweathermap': (10000, 1)}
+
+@pytest.fixture
+def stub_server():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    runners = []
+
+    def start(**app_kwargs):
+        # (base_url, stats) of a fresh stub; stats counts requests the server saw
+        app_kwargs.setdefault('latency', 0)
+        runner, url = asyncio.run_coroutine_threadsafe(start_stub_server(**app_kwargs), loop).result()
+        runners.append(runner)
+        return url, runner.app[STATS]
+
+    yield start
+    for runner in runners:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def fetch_once(url, city='Paris', api_key='test-key', **fetcher_kwargs):
+    # (record or WeatherFetchError, fetcher stats, seconds taken)
+    fetcher_kwargs.setdefault('rate_limits', UNLIMITED)
+    fetcher_kwargs.setdefault('backoff', 0.01)
+
+    async def run():
+        async with AsyncWeatherFetcher(api_key, base_urls={'openweathermap': url}, **fetcher_kwargs) as fetcher:
+            start = time.perf_counter()
+            try:
+                result = await fetcher.fetch(city)
+            except WeatherFetchError as error:
+                result = error
+            return result, fetcher.stats, time.perf_counter() - start
+
+    return asyncio.run(run())
+
+def test_fetch_returns_normalized_record(stub_server):
+    url, stats = stub_server()
+    record, fetcher_stats, _ = fetch_once(url)
+    assert record['city'] == 'Paris'
+    assert set(record) == {'city', 'time', 'temperature', 'humidity', 'wind_speed', 'wind_direction',
+                           'cloudiness', 'weather_condition'}
+    assert stats['requests'] == 1
+    assert fetcher_stats == {'requests': 1, 'retries': 0, 'failures': 0}
+
+def test_retries_429_and_503(stub_server):
+    url, stats = stub_server(statuses=[429, 503, 500], retry_after='0')
+    record, fetcher_stats, _ = fetch_once(url, retries=3)
+    assert record['city'] == 'Paris'
+    assert stats['requests'] == 4
+    assert fetcher_stats['retries'] == 3
+    assert fetcher_stats['failures'] == 0
+
+def test_gives_up_after_retries(stub_server):
+    url, stats = stub_server(statuses=[503] * 5)
+    error, fetcher_stats, _ = fetch_once(url, retries=2)
+    assert isinstance(error, WeatherFetchError)
+    assert 'HTTP 503' in str(error)
+    assert stats['requests'] == 3
+    assert fetcher_stats['failures'] == 1
+
+@pytest.mark.parametrize('status', [401, 404])
+def test_client_errors_fail_immediately(stub_server, status):
+    url, stats = stub_server(statuses=[status])
+    error, fetcher_stats, _ = fetch_once(url, retries=3)
+    assert isinstance(error, WeatherFetchError)
+    assert f'HTTP {status}' in str(error)
+    assert stats['requests'] == 1
+    assert fetcher_stats['retries'] == 0
+
+def test_missing_api_key_is_not_retried(stub_server):
+    url, stats = stub_server()
+    error, _, _ = fetch_once(url, api_key='', retries=3)
+    assert 'HTTP 400' in str(error)
+    assert stats['requests'] == 1
+
+def test_honours_retry_after(stub_server):
+    # With backoff off, the only wait before the retry is the server's Retry-After
+    url, _ = stub_server(statuses=[429], retry_after='0.4')
+    record, _, elapsed = fetch_once(url, backoff=0)
+    assert record['city'] == 'Paris'
+    assert elapsed >= 0.4
+
+def test_retry_after_is_capped_by_max_backoff(stub_server):
+    url, _ = stub_server(statuses=[429], retry_after='30')
+    record, _, elapsed = fetch_once(url, backoff=0, max_backoff=0.1)
+    assert record['city'] == 'Paris'
+    assert elapsed < 5
+
+def test_timeouts_are_retried_then_reported(stub_server):
+    url, stats = stub_server(latency=1.0)
+    error, fetcher_stats, elapsed = fetch_once(url, timeout=0.1, retries=1, backoff=0)
+    assert isinstance(error, WeatherFetchError)
+    assert 'TimeoutError' in str(error)
+    assert stats['requests'] == 2
+    assert fetcher_stats['retries'] == 1
+    assert elapsed < 1.0
+
+def test_rate_limiter_allows_burst_then_paces():
+    async def acquire_times(limiter, count):
+        start = time.perf_counter()
+        times = []
+        for _ in range(count):
+            await limiter.acquire()
+            times.append(time.perf_counter() - start)
+        return times
+
+    # 5 requests per 0.5 s: the first 5 go at once, the next 5 at 0.1 s intervals
+    times = asyncio.run(acquire_times(RateLimiter(5, 0.5), 10))
+    assert times[4] < 0.05
+    assert times[9] >= 0.45
+    assert times[9] < 1.0
+
+def test_rate_limiter_is_shared_by_concurrent_fetches(stub_server):
+    url, stats = stub_server()
+
+    async def run():
+        async with AsyncWeatherFetcher('test-key', rate_limits={'openweathermap': (4, 0.4)},
+                                       base_urls={'openweathermap': url}) as fetcher:
+            start = time.perf_counter()
+            records = await fetcher.fetch_many([f'City_{i}' for i in range(8)])
+            return records, time.perf_counter() - start
+
+    records, elapsed = asyncio.run(run())
+    assert [record['city'] for record in records] == [f'City_{i}' for i in range(8)]
+    assert stats['requests'] == 8
+    assert elapsed >= 0.35
+
+def test_fetch_many_reports_failures_in_place(stub_server):
+    url, _ = stub_server(statuses=[404])
+
+    async def run():
+        async with AsyncWeatherFetcher('test-key', rate_limits=UNLIMITED, base_urls={'openweathermap': url}) as fetcher:
+            return await fetcher.fetch_many(['Paris'])
+
+    assert isinstance(asyncio.run(run())[0], WeatherFetchError)
+
+def test_sync_wrappers_work_inside_a_running_loop(stub_server, monkeypatch):
+    # The control server calls these from async handlers; they must not try to nest loops
+    url, stats = stub_server()
+    monkeypatch.setitem(fetch_data.PROVIDERS['openweathermap'], 'url', url)
+
+    async def handler():
+        return (fetch_data.fetch_weather_data('sync-test-key', 'Paris'),
+                fetch_data.fetch_weather_records('sync-test-key', ['Oslo', 'Rome']))
+
+    try:
+        raw, records = asyncio.run(handler())
+    finally:
+        fetch_data._background_fetcher.run('sync-test-key', 'close')
+    assert raw['name'] == 'Paris'
+    assert [record['city'] for record in records] == ['Oslo', 'Rome']
+    assert stats['requests'] == 3
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from ai_control_system.numpy_mlp import NumpyMLP, check_parity, export_model_bundle, load_model_bundle
+
+ATOL = 1e-5
+
+def fitted_scaler(rng):
+    from sklearn.preprocessing import StandardScaler
+
+    return StandardScaler().fit(rng.normal([20, 60, 5, 180, 50], [8, 15, 3, 90, 30], size=(500, 5)))
+
+def test_bundle_matches_keras_model_and_scaler(tmp_path):
+    tf = pytest.importorskip('tensorflow')
+    import joblib
+
+    rng = np.random.default_rng(0)
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(6,)),
+        tf.keras.layers.Dense(16, activation='relu'),
+        tf.keras.layers.Dense(8, activation='tanh'),
+        tf.keras.layers.Dense(3, activation='sigmoid')
+    ])
+    scaler = fitted_scaler(rng)
+    model_path = str(tmp_path / 'model.keras')
+    scaler_path = str(tmp_path / 'scaler.pkl')
+    bundle_path = str(tmp_path / 'model.npz')
+    model.save(model_path)
+    joblib.dump(scaler, scaler_path)
+
+    export_model_bundle(model_path, scaler_path, bundle_path, version='test')
+    numpy_model, numpy_scaler = load_model_bundle(bundle_path)
+    assert numpy_model.version == 'test'
+    assert numpy_model.activations == ['relu', 'tanh', 'sigmoid']
+
+    inputs = rng.normal(size=(256, 6)).astype(np.float32)
+    np.testing.assert_allclose(numpy_model.predict(inputs), model.predict(inputs, verbose=0), atol=ATOL, rtol=0)
+    raw = rng.normal(scaler.mean_, scaler.scale_, size=(256, 5))
+    np.testing.assert_allclose(numpy_scaler.transform(raw), scaler.transform(raw), atol=ATOL, rtol=0)
+
+    model_error, scaler_error = check_parity(model_path, scaler_path, bundle_path, atol=ATOL)
+    assert model_error <= ATOL and scaler_error <= ATOL
+
+def test_numpy_mlp_rejects_unknown_activation():
+    with pytest.raises(ValueError):
+        NumpyMLP([np.eye(2)], [np.zeros(2)], ['gelu'])
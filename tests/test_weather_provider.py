@@ -0,0 +1,130 @@
+import threading
+import time
+import pytest
+from data_acquisition.weather_provider import WeatherProvider
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class CountingSource:
+    # Weather source returning {'call': n} for its n-th call. While `gate` is cleared, calls
+    # block until it is set, so tests can hold a fetch in flight.
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, api_key, city):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        self.started.set()
+        assert self.gate.wait(5), "fetch was never released"
+        if self.fail:
+            raise ConnectionError("source down")
+        return {'city': city, 'call': call}
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the provider"
+        time.sleep(0.005)
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def source():
+    return CountingSource()
+
+@pytest.fixture
+def provider(source, clock):
+    return WeatherProvider('key', 'Oslo', source=source, ttl=300, stale_ttl=3600, clock=clock)
+
+def test_fresh_entries_are_served_from_cache(provider, source, clock):
+    first = provider.get()
+    clock.advance(299)
+    assert provider.get() is first
+    assert source.calls == 1
+    assert provider.stats['misses'] == 1
+    assert provider.stats['hits'] == 1
+
+def test_cities_are_cached_separately(provider, source):
+    assert provider.get()['city'] == 'Oslo'
+    assert provider.get('Rome')['city'] == 'Rome'
+    assert provider.get('Rome')['city'] == 'Rome'
+    assert source.calls == 2
+
+def test_expired_entries_are_fetched_synchronously(provider, source, clock):
+    assert provider.get()['call'] == 1
+    clock.advance(300 + 3600)
+    assert provider.get()['call'] == 2
+    assert source.calls == 2
+    assert provider.stats['misses'] == 2
+    assert provider.stats['stale_hits'] == 0
+
+def test_stale_entries_are_served_while_one_refresh_runs(provider, source, clock):
+    provider.get()
+    clock.advance(301)
+    source.gate.clear()
+    source.started.clear()
+
+    # Served at once, although the refresh is blocked in the source
+    assert provider.get()['call'] == 1
+    assert provider.get()['call'] == 1
+    assert source.started.wait(5)
+    assert source.calls == 2
+    assert provider.stats['stale_hits'] == 2
+
+    source.gate.set()
+    wait_for(lambda: provider.stats['fetches'] == 2)
+    assert provider.get()['call'] == 2
+    assert provider.stats['hits'] == 1
+    assert source.calls == 2
+
+def test_concurrent_misses_share_one_fetch(provider, source):
+    source.gate.clear()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: provider.stats['misses'] + provider.stats['coalesced'] == 8)
+    source.gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert source.calls == 1
+    assert provider.stats['misses'] == 1
+    assert provider.stats['coalesced'] == 7
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+def test_failed_fetch_without_cached_value_raises(clock):
+    provider = WeatherProvider('key', 'Oslo', source=CountingSource(fail=True), clock=clock)
+    with pytest.raises(ConnectionError):
+        provider.get()
+    assert provider.stats['errors'] == 1
+
+def test_failed_refresh_serves_previous_value(provider, source, clock):
+    provider.get()
+    clock.advance(300 + 3600)
+    source.fail = True
+    assert provider.get()['call'] == 1
+    assert provider.stats['errors'] == 1
+
+def test_invalidate_forces_a_fetch(provider, source):
+    provider.get()
+    provider.invalidate()
+    assert provider.get()['call'] == 2
+    assert source.calls == 2
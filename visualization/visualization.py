@@ -2,9 +2,12 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from mpl_toolkits.mplot3d import Axes3D
-import seaborn as sns
-import plotly.graph_objects as go
-import plotly.express as px
+from lazy_loading import optional_import
+
+# Optional plotting backends; the plots that need them are skipped when they are missing
+sns = optional_import('seaborn', 'Energy heatmap')
+px = optional_import('plotly.express', 'Interactive façade plots')
+go = optional_import('plotly.graph_objects', 'Interactive façade plots')
 
 class FacadeVisualizer:
     def __init__(self):
@@ -12,14 +15,21 @@ class FacadeVisualizer:
         self.energy_data = None
         self.comfort_data = None
 
-    def load_facade_data(self, file_path):
-        self.facade_data = pd.read_csv(file_path)
+    def _load(self, dataset, source, query):
+        # source: a CSV path, or a ColumnarStore queried with read()'s keyword filters
+        # (start_time, end_time, columns, ...)
+        if isinstance(source, str):
+            return pd.read_csv(source)
+        return source.read(dataset, **query)
+
+    def load_facade_data(self, source, **query):
+        self.facade_data = self._load('facade', source, query)
 
-    def load_energy_data(self, file_path):
-        self.energy_data = pd.read_csv(file_path)
+    def load_energy_data(self, source, **query):
+        self.energy_data = self._load('energy', source, query)
 
-    def load_comfort_data(self, file_path):
-        self.comfort_data = pd.read_csv(file_path)
+    def load_comfort_data(self, source, **query):
+        self.comfort_data = self._load('comfort', source, query)
 
     def plot_facade_behavior(self):
         if self.facade_data is None:
@@ -80,6 +90,8 @@ class FacadeVisualizer:
         if self.facade_data is None or self.energy_data is None:
             print("Both facade and energy data must be loaded. Please load data first.")
             return
+        if sns is None:
+            return
 
         merged_data = pd.merge(self.facade_data, self.energy_data, on='time')
         pivot_data = merged_data.pivot('panel_id', 'time', 'energy_use')
@@ -95,6 +107,8 @@ class FacadeVisualizer:
         if self.facade_data is None:
             print("No facade data loaded. Please load data first.")
             return
+        if go is None:
+            return
 
         fig = go.Figure(data=[go.Scatter3d(
             x=self.facade_data['panel_id'],
@@ -128,6 +142,8 @@ class FacadeVisualizer:
         if self.facade_data is None:
             print("No facade data loaded. Please load data first.")
             return
+        if px is None:
+            return
 
         fig = px.scatter(self.facade_data, x='panel_id', y='rotation', animation_frame='time',
                          animation_group='panel_id', size='depth', color='energy_use',
@@ -139,10 +155,14 @@ class FacadeVisualizer:
 if __name__ == "__main__":
     visualizer = FacadeVisualizer()
     
-    # Load sample data (you would replace these with your actual data files)
-    visualizer.load_facade_data('visualization/facade_data.csv')
-    visualizer.load_energy_data('visualization/energy_data.csv')
-    visualizer.load_comfort_data('visualization/comfort_data.csv')
+    # Load the controller history of the last week from the columnar store
+    import time
+    from data_acquisition.columnar_store import ColumnarStore
+    store = ColumnarStore()
+    week_ago = time.time() - 7 * 24 * 3600
+    visualizer.load_facade_data(store, start_time=week_ago)
+    visualizer.load_energy_data(store, start_time=week_ago)
+    visualizer.load_comfort_data(store, start_time=week_ago)
     
     # Generate visualizations
     visualizer.plot_facade_behavior()